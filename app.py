@@ -1,16 +1,36 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, PlainTextResponse
-import requests
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, Field
+from typing import List
+import asyncio
 import os
-import subprocess
 import logging
+import time
 import uuid
 import json
 import re
 
+import batch
+import fast_paths
+import metrics
+from deps import EnvironmentCache
+from embeddings import EMBEDDINGS_BACKEND, EmbeddingService, HashingEmbeddingBackend, OpenAIEmbeddingBackend
+from executor import ExecutorSaturated, ScriptExecutor
+from file_stream import (READ_JSON_MAX_BYTES, RangeNotSatisfiable, guess_media_type, iter_file,
+                         not_modified, parse_range, resolve_within, validators)
+from hedging import HedgedGenerator
+from llm_client import LLMClient, LLMError
+from metrics import EXEC_EXIT_CODES, TraceIdFilter, observe_stage, record_usage, stage
+from prompts import SYSTEM_PROMPT, count_tokens, select_prompt
+from script_cache import ScriptCache, cache_key
+from warm_pool import WarmPool, WarmPoolUnavailable
+
 # Logging setup
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:[%(trace_id)s] %(message)s")
+for log_handler in logging.getLogger().handlers:
+    log_handler.addFilter(TraceIdFilter())
 logger = logging.getLogger(__name__)
 
 # Environment Variables
@@ -20,228 +40,56 @@ if not TOKEN:
     raise RuntimeError("AIPROXY_TOKEN is required but not set.")
 
 # Constants
-DATA_DIR = "/data"  # Execution is restricted to this directory
-OPENAI_API_URL = "http://aiproxy.sanand.workers.dev/openai/v1/chat/completions"
+DATA_DIR = os.environ.get("DATA_DIR", "/data")  # Execution is restricted to this directory
+OPENAI_API_URL = os.environ.get("OPENAI_API_URL", "http://aiproxy.sanand.workers.dev/openai/v1/chat/completions")
+OPENAI_EMBEDDINGS_URL = os.environ.get("OPENAI_EMBEDDINGS_URL", "http://aiproxy.sanand.workers.dev/openai/v1/embeddings")
+LLM_MODEL = "gpt-4o-mini"
+BATCH_MAX_TASKS = int(os.environ.get("BATCH_MAX_TASKS", "50"))
 
 os.makedirs(DATA_DIR, exist_ok=True)
 
-# System Prompt (Placeholder for now)
-
-SYSTEM_PROMPT = """
-- You are an Intelligent Programming Assistant. You are supposed to generate the code for these specific tasks that are mentioned in the section of the CONTEXT
-- Make sure that the entire code which you have generated is working properly and it must be executable the tasks are mentioned carefully the the user prompt
-- You have to re-check your code so that it is good for running the program and ensure no issue every happens with any of the edge cases of wrong inputs
-- You are supposed to write a versatile code so that the code handle some non-obvious inputs you should write these code in python or bash
-- for example if python3 structure like an uv format so that it installs any dependencies that are present in generated code. and give how to execute the code you have generated
-- don't add any comments for python code except at the top of the code which are only supposed to be the comments for the uv so that the uv can run the code by installing all the required packages that are necessary for the execution of the code
-- how to execute the code will be a bash script for example: python3 code_generated.py or ./bash_script.sh or any other steps that need to be followed for the execution of the code
-- The code you generate should be clean enough to handle all the neccesary tasks and optimize the code as much as you can the code you generate is crucial for the execution of the program
-- You going to generate the code only once. so there will no second prompt will be there from the user requesting the same code again and again so you have to prepare the code finally that is capable of handling the edge cases
-- the code you prepeare for the python scripts basically are used to automate the tasks like reading some files and extacting some of the required content from the files while doing so your code must laid in a way that is satisfies all the user requirements and no issues ever occurs while handling the code. as your code is going to be automated
-- for dealing with the bash scripts you have to install all the tools that are going to be required by the program to run the bash script without any issues so while dealing with the commands you have to take care that the every present in the command executes and doesn't throw any error.
-** The precision of the code and the executability of the code matters a lot here it's all about the code you generate will automate the specific task It should not be with an error or any scope for that
-  for the debugging the edge cases it should be versatile enough to handle these tasks
-- While generating the code don't have any preconceived notions on how the format of the inputs file might me so put the code in a way that the code is versatile in handling even if the user gives the instructions in an ambigious way you code is supposed to handle these edge cases
-- You are supposed to handle some of the taks present in the context all of them similar tasks are clearly mentioned up there
-- You add the comments for each code at the top for uv to install dependencies but nothing else except from the dependencies
-
-
-
-RETURN FORMAT:
-- Return the Contents in a JSON Schema as a JSON OBJECT
-- which should contain the code in the "code": "your code"
-- the language should be mentioned as t "language": "langname"
-- how to execute the generated file as "exec": "command to finally run the script"
-- I am going to call what you have returned so the automation for you generated code will be hardcoded hence make sure the prompt you return must be suitable with the hardcoded code block I had
-example: {
-    "code": "print('hello world')",
-    "language": "python",
-    "exec": "uv run code_generated.py"
-}
-- If you can't do that due any issues return as {
-    "error": "400 bad request"
-}
-- don't give me the code in fenced block as ```json [ the json content] ``` just give me the code in the format of json. apart from that json nothing else is required
-- the exec thing in the json must be always be code_generated.py if it is a python script or it should be bash_script.sh just follow these naming conventions for the 
-- generation of the exec and the code strictly follow these naming conventions while generating these things 
-- PLEASE CHECK ONCE AGAIN WHEN YOU GENERATE THESE CODE AND MAKE SURE THAT THE CODE YOU GENERATED IS CAPABLE FOR PERFORMING THAT SPECIFIC TASK CHECK AND GENERATE THE CODE
-- Since the content you generate will be in inside the double quotes like "" for a json so inside the code please stick with the single quotes and if a multiline SQL in a python code use ''' these quotes
-
-DETAILS:
-If the task is to format the markdown file using prettier, then do the updation in the file to be formatted. Don`t assume any output path for this task. 
-
-If the task description contains any special characters, especially the '#' symbol, you must ensure that these characters are URL-encoded before constructing the request URL. Specifically, replace every '#' with '%23'. For example, if the task description is "Write the # of {any day} in {any path} into {any path}", your generated code should construct the URL so that the '#' is replaced with '%23', resulting in a URL like:
-"http://127.0.0.1:8000/run?task=Write%20the%20%23%20of%20{any%20day}%20in%20{any path}%20into%20{any path}". This is just an example. Do not assume it to be the actual task description. For example the day can be any day of the week. It could be Monday tuesday any day. 
-First extract the task description as it is passed in the url. Then encode it. Use the correct task description. Do not take it to be random.
-Use Python's urllib.parse.quote() (or an equivalent method) to perform this encoding. Ensure that the final URL contains no unencoded '#' characters.
-
-If you ever see the phrase ‘count the # of’ in a task, please interpret it as ‘count the number of’. For example
-Count the # of Fridays means
-Count the number of Fridays
-
-Ensure that the generated code always imports the necessary modules for the code to run without any error. For example, if you use any date functions, always include 'from datetime import datetime' at the beginning of your code.
-If the task involves reading or writing files, always use the `/data/` directory relative to the app's runtime environment (i.e., where the script is being executed, and the app's endpoints are located). The `/data/` directory is a subdirectory of the current working directory, and the current working directory can be dynamically determined using Python's `os.getcwd()`. Do not assume paths refer to other environments or directories. If any task description mentions a file to be read from or written to, ensure that the path is dynamically set relative to the `/data/` directory of the script's runtime environment using `os.path.join(os.getcwd(), 'data', '<filename>')`.
-The generated code should be safe, concise, and use standard Python libraries. Ensure that file operations stay within /data. You should only and only write the expected output from the task description to the /data folder of that directory from where you read the input path and not anywhere else no matter what.
-When processing date-related tasks, ensure the code:
-- Dynamically detects different date formats. The dates can be in any of these formats: 
-    2000/07/17 05:43:49, 26-Sep-2016, 2007-12-05, Apr 11, 2004, 2008-03-24, Jan 25, 2015, Feb 19, 2018, 2010/05/06 10:00:29, 22-Nov-2013, 2005-03-01, 2010/05/17 19:11:44.
-- Uses multiple format patterns in `datetime.strptime()` to handle variations.
-- If parsing fails, log an appropriate error message.
-If the task involves to extract the sender’s email address, do not extract the name of sender. Only extract the email address. The file would contain something like this- **From: "Donna Jackson" <buckleymatthew@example.net>**(take it just as an example). You have to extract only **buckleymatthew@example.net** and not the name of the sender. 
-If the task mentions about SQLDatabase then pay extra attention to translated version of task descrition to get the desired output.
-
-If you get any task about recent logs, remember You are an assistant that generates syntax-free executable Python code to complete given tasks. For any lambda functions that reference variables from an outer scope (such as a variable named log_dir), you MUST capture those variables by specifying them as default parameters. For example, instead of writing:
-
-    key=lambda x: os.path.getmtime(os.path.join(log_dir, x))
-
-you must write:
-
-    key=lambda x, log_dir=log_dir: os.path.getmtime(os.path.join(log_dir, x))
-
-This is required to avoid errors like "name 'log_dir' is not defined" when the lambda function is executed. Please generate the complete code for the following task, ensuring that any lambda referencing outer-scope variables captures them in its default parameters.
-
-If the task asks about extracting a credit card number from the image, then use easyocr library to extract the credit card number from the image.
-
-If the task mentions about finding similar pair of comments, then use embeddings to find the similar pair of comments. Do not use SentenceTransformers library. Use openAi embeddings model for the task. 
-
-
-If The task is to fetch data from a given API endpoint and save the response in a file. You are an assistant that generates Python code to make HTTP requests.  
-
-Here are the steps to follow:
-1. Verify that the API URL provided is correct and corresponds to an existing endpoint.
-2. If the API requires authentication (e.g., API keys or tokens), ensure that you include the appropriate headers with the request.
-3. If the API expects query parameters or additional data, make sure those are correctly formatted and included in the request.
-4. Use the `requests` module to make the GET request. Check the HTTP status code in the response:
-    - If the status code is 200, save the response data into a file (JSON format if it is JSON).
-    - If the status code is 404 or any other error, print the status code, URL, and response text to help debug the issue. Also explain why the 404 error is occuring and how to fix it.
-5. Ensure you handle the error gracefully and don't proceed with further operations if the endpoint isn't accessible.
-
-You are an assistant that generates Python code dynamically for automating tasks. When the task involves cloning a Git repository and making a commit, and pushes them without interactive authentication, you need to ensure that:
-1. **Do not attempt to install Git as a Python dependency**. Git is a command-line tool and should be assumed to be already installed on the system. consider using the Python library `GitPython` (if necessary).
-2. **Before committing** any changes, the files(which are created inside the repo) need to be staged using the `git add` command.
-3. The code must:
-   - Clone the Git repository.
-   - Check the available branches of the repository to determine the default branch (usually main or master).
-   - Create a new file **inside the repository** and write to file inside the cloned repository.
-   - Add the files to the staging area using `git add`
-   - Commit the changes.
-   - Push the changes to the remote repository(in the correct branch)
-   - Ensure that the push is made to the correct branch(use git branch -r to check the available branches)
-4. Use either a GitHub token for HTTPS authentication or SSH authentication to avoid manual username/password prompts.
-5. Ensure Git credentials are properly configured.
-
-Ensure that **Git** is already available on the system (i.e., not part of the Python dependencies) and rely on system commands or the `GitPython` library for repository interactions.
-Handle the error - No module named 'git'. 
-
-To check the available branches, use git branch -r and then identify the default branch (typically main or master). Ensure that the push is made to the correct branch.
-
-For the specific task, please ensure the generated code properly stages changes before attempting to commit them. Here’s how the process should look:
-- **Staging the changes**: Run `git add .` to stage all new or modified files.
-- **Commit the changes**: Use `git commit -am "message"`.
-- **Push the changes**: Use `git push origin {branch}`.
-
-Please generate the Python code for the following task:
-- Clone the Git repository from the provided URL.
-- Make changes (e.g., add new files inside the repository).
-- Stage the changes with `git add`.
-- Commit the changes with a message.
-- Push the changes to the remote repository(in the correct branch)
-
-If Your task is to run an SQL query on a given SQLite or DuckDB database then You are a SQL execution agent. Your task is to execute the provided SQL query and return the results accurately.
-
-Input Details:
-- The task description will specify the type of database (SQLite or DuckDB) and provide details on the available tables, columns, and any constraints.
-- The SQL query to execute will be provided explicitly in the task description.
-Execution Instructions:
-- Ensure the query is valid for the specified database type.
-- Execute the query safely without modifying the database unless explicitly requested.
-- Return the query result in a structured format (JSON, table, or plain text as required).
-- If an error occurs, return a helpful error message explaining the issue.
-
-If Your task is to extract specific data from a given website then You are a web scraping agent. Your task is to extract the requested data based on the provided instructions.
-
-Input Details:
-- The task description will specify the target website URL and the type of data to extract (e.g., text, tables, links, images, metadata).
-- It may also specify the structure of the output (e.g., JSON, CSV, or formatted text).
-- If authentication, headers, or specific request parameters are required, they will be provided in the task description.
-Execution Instructions:
-- Access the given website and locate the required data.
-- Inspect the HTML structure of the website you're scraping and find the relevant classes and tags for the data I want to extract. You can use lxml.cssselect to find these elements. Update your scraping logic based on the actual HTML structure you find.
-- Extract the requested information while preserving its structure.
-- If pagination is involved, iterate through all pages to collect complete data.
-- Return the extracted data in the requested format (e.g., JSON, CSV).
-- Handle errors gracefully and return a meaningful error message if extraction fails. Handle this error - No module named 'bs4'. Ensure that bs4 is installed on the system and importable.
-
-If the task is to compress or resize an image then You are an image processing agent. Your task is to compress or resize the provided image.
-The image may be sourced from a URL or a local directory. Adjust your code accordingly to handle the input format. Ensure that the output image retains good quality while meeting the specified compression ratio or target dimensions. Save the processed image in the appropriate format and location as per the task requirements.
-
-
-If the task is to transcribe audio from an MP3 file then You are an audio processing agent. Your task is to Generate Python code to transcribe an MP3 file. The audio file may be downloaded from a URL or read from a local directory. The code should:
-1. Download the audio file if provided as a URL, or read it from a local directory if not.
-2. Convert the audio file to WAV format if necessary (for example, using pydub) because the transcription library requires WAV input.
-3. Use a stable and well-tested library (such as SpeechRecognition) to perform the transcription using the Google Web Speech API.
-4. Include robust error handling so that any issues during download, conversion, or transcription are caught and an informative error message is provided.
-5. Ensure that all file operations are confined to a designated '/data' directory.
-6. Provide complete, executable Python code with all necessary import statements.
-7. Do not use Whisper or any library that might throw build errors.
-8. Avoid the error 'No module named 'pyaudioop' by aliasing Python's built-in 'audioop' module as 'pyaudioop' at the start of the code.
-Ensure that all file paths are relative to the '/data' directory and include all necessary import statements."**
-
-If the task mentions abot converting markdown to HTML then You are a markdown processing agent. Your task is to generate Python code to convert the provided markdown file to HTML. The code should:
-Generate complete, executable Python code to convert a Markdown file to HTML. The code should:
-
-Input/Output Handling:
-
-
-Read a Markdown file from a specified input path. The path can be provided as a URL or a local file path.
-Write the generated HTML to a specified output file path.
-Ensure all file operations are confined to the '/data' directory.
-Markdown Conversion Requirements:
-
-Use the Python 'markdown' library for the conversion.
-Ensure that list elements are correctly converted to HTML:
-Unordered lists starting with '-' or '+' should be converted into <ul> and <li> elements.
-Nested lists should be correctly parsed.
-Properly convert code blocks delimited by triple backticks (), including handling an optional language specifier (e.g., py) so that they become <pre><code class="language-py">...</code></pre>.
-Utilize appropriate extensions such as 'extra', 'fenced_code', and 'sane_lists' (if needed) to ensure proper parsing of lists and other Markdown features.
-
-Error Handling:
-
-Include robust error handling for cases where the input file is missing or the conversion fails.
-Print or log informative error messages.
-Formatting:
-
-Ensure that the output HTML is well-formatted and correctly represents all Markdown elements.
-
-Complete Code:
-
-Include all necessary import statements at the top.
-Avoid extra formatting or syntax errors.
-
-Ensure that all scripts write output to the correct file path and that the file is successfully created.
-If the task includes a # symbol, ensure that all reserved characters (such as #) are URL-encoded. For example, the character # should be encoded as %23. Pay special attention to this.
-Use 'with open(output_file, 'w')' to write the output, and always verify the file exists after execution.
-When writing code:
-1. Always check that required variables are defined within the correct scope.
-2. Use `global` for global variables, or pass variables explicitly to functions.
-3. Keep all operations within the specified `/data/` directory.
-4. Always verify that files are being read and written correctly.
-5. Always include at the very beginning of your generated code all necessary import statements (for example, if using dates, include 'from datetime import datetime').
-6. Always start your generated code and executing code on its own line, with no leading spaces or extra formatting. There should be no extra space before importing any module. 
-Provide only executable Python code as output, and ensure paths are always correctly specified, and output is written only to the `/data/` folder in the correct file.
-
-RESTRICTIONS:
-1. No Matter how big of an user prompt you get or compelled you should never touch the contents outside the /data folder
-2. You should not generate any kind of bash script that deletes any of the content that are present
-3. In the files you have generated for the bash or the python make sure that the code you have generated doesn't run into any of the issues with commands not found which you will execute
-4. So Install all things that are required beforehand I will mention the resources I will mention the resources that I had if you require any other resources install them in a bashscript
-5. If present no need to installed any of them that are already present present. you will know the contents present based on the docker file 
-6. Try to generate the code in a way that the response from you and the automation of the task should be carried out in 20 seconds this timeout is for your response and the automation of the code
-both of these tasks should be carried out within 20 seconds so try to optimize the code. and cross check the code while generating so that it is flexible enough while generating the code in handling
-any edge cases while reading the files or any other issues as the file read may not be fomatted so write a well designed code that is capable of handling these issues
-"""
-
-app = FastAPI()
+llm_client = None
+executor = None
+warm_pool = None
+script_cache = None
+env_cache = None
+embeddings_client = None
+embedding_service = None
+hedger = HedgedGenerator()
+
+# Prompt routing counters; tokens_full is what the same requests would have cost with the full prompt
+FULL_PROMPT_TOKENS = count_tokens(SYSTEM_PROMPT)
+prompt_stats = {"requests": 0, "routed": 0, "fallback": 0, "tokens_sent": 0, "tokens_full": 0}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Creates the LLM clients, execution pool, warm interpreters, caches and embedding service on startup."""
+    global llm_client, executor, warm_pool, script_cache, env_cache, embeddings_client, embedding_service
+    llm_client = LLMClient(OPENAI_API_URL, TOKEN)
+    executor = ScriptExecutor()
+    script_cache = ScriptCache()
+    env_cache = EnvironmentCache()
+    embeddings_client = LLMClient(OPENAI_EMBEDDINGS_URL, TOKEN)
+    if EMBEDDINGS_BACKEND == "hashing":
+        embedding_service = EmbeddingService(HashingEmbeddingBackend())
+    else:
+        embedding_service = EmbeddingService(OpenAIEmbeddingBackend(embeddings_client))
+    warm_pool = WarmPool()
+    # Zygotes load easyocr models, so warm them in the background; cold python3 is used until ready.
+    warm_start = asyncio.create_task(warm_pool.start())
+    try:
+        yield
+    finally:
+        warm_start.cancel()
+        await warm_pool.stop()
+        await env_cache.close()
+        await llm_client.aclose()
+        await embeddings_client.aclose()
+        script_cache.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 # Allow requests from any origin (Modify this for security in production)
@@ -251,110 +99,505 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all HTTP methods (GET, POST, etc.)
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Trace-Id", "Server-Timing"],
 )
 
+METRIC_ENDPOINTS = {"/run", "/run/stream", "/run/batch", "/read", "/stats", "/metrics",
+                    "/embeddings", "/embeddings/similar-pair", "/embeddings/top-k"}
+
 
-def query_llm(task: str) -> str:
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """
+    Assigns a trace ID (honouring an incoming X-Trace-Id), times the request and,
+    when enabled or asked for with `X-Timing: 1`, returns the stage breakdown as Server-Timing.
+    """
+    endpoint = request.url.path if request.url.path in METRIC_ENDPOINTS else "other"
+    timings = metrics.start_request(endpoint, request.headers.get("x-trace-id"))
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    metrics.REQUEST_SECONDS.labels(endpoint, str(response.status_code)).observe(elapsed)
+    response.headers["X-Trace-Id"] = metrics.trace_id_var.get()
+    if metrics.METRICS_TIMING_HEADER or request.headers.get("x-timing") == "1":
+        response.headers["Server-Timing"] = metrics.server_timing({**timings, "total": elapsed})
+    return response
+
+
+async def query_llm(task: str, system_prompt: str = SYSTEM_PROMPT) -> str:
     """Sends the task to the LLM and retrieves an executable script."""
     payload = {
-        "model": "gpt-4o-mini",
+        "model": LLM_MODEL,
         "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": system_prompt},
             {"role": "user", "content": task}
         ]
     }
-    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
     try:
-        response = requests.post(OPENAI_API_URL, json=payload, headers=headers)
-        response.raise_for_status()
-        response_json = response.json()
-        if "choices" not in response_json or not response_json["choices"]:
-            logger.error(f"Invalid LLM response: {response_json}")
-            raise HTTPException(status_code=500, detail="LLM response missing 'choices' field")
-        return response_json["choices"][0]["message"]["content"]
-    except requests.RequestException as e:
+        with stage("llm"):
+            response_json = await llm_client.chat(payload)
+    except LLMError as e:
         logger.error(f"LLM request failed: {e}")
         raise HTTPException(status_code=500, detail="LLM request failed")
+    if "choices" not in response_json or not response_json["choices"]:
+        logger.error(f"Invalid LLM response: {response_json}")
+        raise HTTPException(status_code=500, detail="LLM response missing 'choices' field")
+    record_usage(response_json)
+    return response_json["choices"][0]["message"]["content"]
+
+
+async def query_llm_stream(task: str, system_prompt: str, on_token) -> str:
+    """Like query_llm, but streams the completion and passes each token to `on_token`."""
+    payload = {
+        "model": LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": task}
+        ]
+    }
+    parts = []
+    try:
+        with stage("llm"):
+            async for token in llm_client.stream_chat(payload):
+                parts.append(token)
+                on_token(token)
+    except LLMError as e:
+        logger.error(f"LLM request failed: {e}")
+        raise HTTPException(status_code=500, detail="LLM request failed")
+    return "".join(parts)
+
+
+def parse_script(llm_response_raw: str) -> dict:
+    """Validates the raw LLM completion and returns its `{code, language, exec}` fields."""
+    # Validate the LLM response
+    if not llm_response_raw or not isinstance(llm_response_raw, str):
+        logger.error("Invalid LLM response: Response is None or not a string")
+        raise HTTPException(status_code=500, detail="Invalid LLM response")
+
+    # Parse the cleaned JSON response
+    try:
+        llm_response = json.loads(llm_response_raw)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to decode JSON response: {e}")
+        raise HTTPException(status_code=400, detail="Invalid JSON response from LLM")
+
+    # Extract fields from the JSON response
+    code = llm_response.get("code")
+    language = llm_response.get("language")
+    exec_command = llm_response.get("exec")
+
+    if not code or not language or not exec_command:
+        raise HTTPException(status_code=400, detail="Invalid LLM response: Missing required fields ('code', 'language', or 'exec')")
+    return {"code": code, "language": language, "exec": exec_command}
+
+
+async def generate_script(task: str, on_token=None) -> tuple:
+    """
+    Returns the validated script for a task and metadata about how it was produced.
+    - Routes the task to a category so only the relevant prompt section is sent.
+    - Serves repeated tasks from the script cache.
+    - Otherwise queries the LLM (hedged, or streaming tokens to `on_token` if given)
+      and caches the validated response.
+    """
+    category, system_prompt = select_prompt(task)
+    key = cache_key(task, system_prompt, LLM_MODEL)
+    meta = {"key": key, "category": category or "full", "prompt_tokens": 0, "cached": False}
+    with stage("cache_lookup"):
+        script = await asyncio.to_thread(script_cache.get, key)
+    if script is not None:
+        logger.info(f"Script cache hit for {key[:12]}")
+        meta["cached"] = True
+        return script, meta
+
+    # Get JSON response from LLM
+    meta["prompt_tokens"] = count_tokens(system_prompt) + count_tokens(task)
+    prompt_stats["requests"] += 1
+    prompt_stats["routed" if category else "fallback"] += 1
+    prompt_stats["tokens_sent"] += meta["prompt_tokens"]
+    prompt_stats["tokens_full"] += FULL_PROMPT_TOKENS + count_tokens(task)
+    logger.info(f"Prompt category: {meta['category']}, prompt tokens: {meta['prompt_tokens']}")
+    if on_token is None:
+        # Hedge slow or invalid completions: the first attempt that parses wins
+        async def attempt():
+            llm_response_raw = await query_llm(task, system_prompt)
+            with stage("parse"):
+                return parse_script(llm_response_raw)
+        script = await hedger.generate(attempt)
+    else:
+        llm_response_raw = await query_llm_stream(task, system_prompt, on_token)
+        with stage("parse"):
+            script = parse_script(llm_response_raw)
+    await asyncio.to_thread(script_cache.put, key, task, script)
+    return script, meta
+
+
+async def execute_script(script: dict, on_output=None) -> str:
+    """
+    Writes the script to /data, executes it and returns its stdout.
+    `on_output(stream_name, line)` receives stdout/stderr lines while the script runs.
+    """
+    code = script["code"]
+    language = script["language"]
+
+    # Generate safe file path
+    file_ext = "sh" if language == "bash" else "py"
+    file_name = f"23f2001task_{uuid.uuid4().hex}.{file_ext}"
+    script_path = os.path.join(DATA_DIR, file_name)
+
+    # Write script to /data
+    with stage("script_write"):
+        with open(script_path, "w") as script_file:
+            script_file.write(code)
+
+        # Make executable if Bash
+        if file_ext == "sh":
+            os.chmod(script_path, 0o755)
+
+    # Resolve inline (PEP 723) and imported dependencies to a cached offline env, if any are missing
+    interpreter = None
+    if language == "python":
+        with stage("dependencies"):
+            interpreter = await env_cache.interpreter_for(code)
+
+    # Replace placeholders in the exec command with the actual script path
+    exec_argv = [interpreter or "python3", script_path] if language == "python" else ["bash", script_path]
+
+    # Execute the script in the bounded execution pool, in a warm interpreter when available
+    with stage("execution"):
+        result = None
+        if interpreter is None and warm_pool.supports(language):
+            try:
+                result = await executor.run_warm(warm_pool, script_path, on_output=on_output)
+            except WarmPoolUnavailable as e:
+                logger.warning(f"Warm pool unavailable, using a cold interpreter: {e}")
+        if result is None:
+            result = await executor.run(exec_argv, on_output=on_output)
+        observe_stage("spawn", result.spawn_duration)
+        observe_stage("script", result.duration - result.spawn_duration)
+        EXEC_EXIT_CODES.labels("timeout" if result.timed_out else str(result.returncode)).inc()
+        if result.timed_out:
+            logger.error(f"Execution timed out after {executor.timeout}s")
+            raise HTTPException(status_code=500, detail=f"Execution timed out after {executor.timeout}s")
+        if result.returncode != 0:
+            logger.error(f"Execution failed: {result.stderr}")
+            raise HTTPException(status_code=500, detail=f"Execution error: {result.stderr}")
+    return result.stdout.strip()
+
+
+async def timed(awaitable, timings: dict, name: str):
+    """Awaits `awaitable`, recording its duration in seconds as `timings[name]`."""
+    started = time.monotonic()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = round(time.monotonic() - started, 4)
+
+
+async def run_task(task: str, emit=None, generation=None, timings: dict = None) -> tuple:
+    """
+    Runs a task through fast paths, generation and execution.
+    Returns `(status_code, content, headers)`; when `emit(event, data)` is given, progress
+    events, LLM tokens and script output lines are reported through it as they happen.
+    `generation` may be an already-started generate_script task; stage durations go into `timings`.
+    """
+    streaming = emit is not None
+    emit = emit or (lambda event, data: None)
+    timings = {} if timings is None else timings
+    try:
+        logger.info(f"Processing task: {task}")
+
+        # Deterministic task families need neither the LLM nor a generated script
+        with stage("fast_path"):
+            fast = await fast_paths.dispatch(task, DATA_DIR, executor)
+        if fast is not None:
+            name, output = fast
+            logger.info(f"Task answered by fast path: {name}")
+            emit("stage", {"stage": "fast_path", "handler": name})
+            return 200, {"status": "success", "output": output}, {"X-Fast-Path": name}
+
+        # Shed load before spending an LLM call when the execution pool is full
+        if executor.saturated:
+            raise ExecutorSaturated("Execution queue is full")
+
+        emit("stage", {"stage": "generation_started"})
+        on_token = (lambda token: emit("token", {"text": token})) if streaming else None
+        if generation is None:
+            generation = timed(generate_script(task, on_token=on_token), timings, "generation")
+        script, meta = await generation
+        emit("stage", {"stage": "code_received", "language": script["language"], "code": script["code"],
+                       "cached": meta["cached"]})
+
+        emit("stage", {"stage": "execution_started"})
+        on_output = (lambda stream, line: emit(stream, {"line": line})) if streaming else None
+        try:
+            output = await timed(execute_script(script, on_output=on_output), timings, "execution")
+        except HTTPException:
+            # Never serve a script that failed again
+            await asyncio.to_thread(script_cache.invalidate, meta["key"])
+            raise
+
+        # Return success response
+        headers = {"X-Task-Category": meta["category"], "X-Prompt-Tokens": str(meta["prompt_tokens"])}
+        return 200, {"status": "success", "output": output}, headers
+
+    except ExecutorSaturated as e:
+        logger.warning(f"Rejecting task, execution pool saturated: {e}")
+        return 503, {"status": "error", "message": str(e)}, {"Retry-After": "1"}
+    except Exception as e:
+        logger.exception("Task execution failed")
+        return 500, {"status": "error", "message": str(e)}, {}
+
 
 @app.post("/run", response_model=dict)
 async def handle_post(task: str):
     """
     Handles POST requests to execute tasks.
-    - Passes the task to LLM.
+    - Answers deterministic task families in-process through the fast-path handlers.
+    - Otherwise passes the task to LLM (or reuses a cached script for a repeated task).
     - Extracts the execution script from the JSON response.
     - Writes it to /data.
     - Executes it immediately using the `exec` key.
     - Returns the output directly in the response.
     """
-    try:
-        logger.info(f"Processing task: {task}")
+    status_code, content, headers = await run_task(task)
+    return JSONResponse(content=content, status_code=status_code, headers=headers)
 
-        # Get JSON response from LLM
-        llm_response_raw = query_llm(task)
 
-        # Validate the LLM response
-        if not llm_response_raw or not isinstance(llm_response_raw, str):
-            logger.error("Invalid LLM response: Response is None or not a string")
-            raise HTTPException(status_code=500, detail="Invalid LLM response")
+@app.post("/run/stream")
+async def handle_post_stream(task: str):
+    """
+    Streaming variant of /run as server-sent events.
+    - `stage` events: fast_path, generation_started, code_received, execution_started.
+    - `token` events carry LLM tokens as they arrive; `stdout`/`stderr` events carry script output lines.
+    - A final `result` event carries the same payload /run would return, plus its `status_code`.
+    """
+    queue = asyncio.Queue()
 
-        # Parse the cleaned JSON response
+    async def produce():
+        status_code, content, _ = await run_task(task, emit=lambda event, data: queue.put_nowait((event, data)))
+        queue.put_nowait(("result", {**content, "status_code": status_code}))
+        queue.put_nowait(None)
+
+    async def events():
+        producer = asyncio.create_task(produce())
         try:
-            llm_response = json.loads(llm_response_raw)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode JSON response: {e}")
-            raise HTTPException(status_code=400, detail="Invalid JSON response from LLM")
+            while (item := await queue.get()) is not None:
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Client went away (or we are done): stop generation and kill the script
+            producer.cancel()
 
-        # Extract fields from the JSON response
-        code = llm_response.get("code")
-        language = llm_response.get("language")  # Note: Typo in "langugae"
-        exec_command = llm_response.get("exec")
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
-        if not code or not language or not exec_command:
-            raise HTTPException(status_code=400, detail="Invalid LLM response: Missing required fields ('code', 'language', or 'exec')")
 
-        # Generate safe file path
-        file_ext = "sh" if language == "bash" else "py"
-        file_name = f"23f2001task_{uuid.uuid4().hex}.{file_ext}"
-        script_path = os.path.join(DATA_DIR, file_name)
+class BatchRequest(BaseModel):
+    tasks: List[str]
 
-        # Write script to /data
-        with open(script_path, "w") as script_file:
-            script_file.write(code)
 
-        # Make executable if Bash
-        if file_ext == "sh":
-            os.chmod(script_path, 0o755)
+@app.post("/run/batch", response_model=dict)
+async def handle_post_batch(batch_request: BatchRequest):
+    """
+    Runs a list of tasks concurrently.
+    - Identical tasks (after whitespace normalization) run once and share a result.
+    - LLM generation starts for every task immediately; execution waits for the tasks whose
+      output files under /data the task reads, so independent tasks run side by side.
+    - At most `executor.max_workers` tasks execute at once, so a batch never overflows the
+      execution queue and sheds its own tasks with 503s.
+    - Returns per-task results in submission order plus an overall timing breakdown.
+    """
+    tasks = batch_request.tasks
+    if not tasks or len(tasks) > BATCH_MAX_TASKS:
+        return JSONResponse(content={"status": "error", "message": f"Expected 1 to {BATCH_MAX_TASKS} tasks"},
+                            status_code=400)
+    started = time.monotonic()
+    unique, index_map = batch.dedupe(tasks)
+    dependencies = batch.plan_dependencies(unique)
+    timings = [{} for _ in unique]
+    runs = {}
+    execution_slots = asyncio.Semaphore(executor.max_workers)
+
+    async def run_planned(index: int) -> dict:
+        task = unique[index]
+        generation = None
+        if not fast_paths.might_handle(task):
+            # Nothing to wait for before talking to the LLM
+            generation = asyncio.create_task(timed(generate_script(task), timings[index], "generation"))
+        try:
+            results = await asyncio.gather(*(runs[dep] for dep in dependencies[index]))
+            timings[index]["waiting"] = round(time.monotonic() - started, 4)
+            failed = sorted(dep for dep, result in zip(dependencies[index], results) if result["status"] != "success")
+            if failed:
+                return {"status": "error", "status_code": 424, "message": f"Dependency failed: tasks {failed}"}
+            if generation is not None:
+                # Don't hold an execution slot while the LLM is still answering
+                await asyncio.wait({generation})
+            async with execution_slots:
+                status_code, content, _ = await run_task(task, generation=generation, timings=timings[index])
+            return {**content, "status_code": status_code}
+        finally:
+            if generation is not None and not generation.done():
+                generation.cancel()
+
+    for index in range(len(unique)):
+        runs[index] = asyncio.create_task(run_planned(index))
+    unique_results = await asyncio.gather(*runs.values())
+
+    results, first_seen = [], {}
+    for position, (task, index) in enumerate(zip(tasks, index_map)):
+        result = {"task": task, **unique_results[index],
+                  "depends_on": sorted(dependencies[index]), "timing": timings[index]}
+        if index in first_seen:
+            result["duplicate_of"] = first_seen[index]
+        else:
+            first_seen[index] = position
+        results.append(result)
+
+    total = time.monotonic() - started
+    generation_total = sum(t.get("generation", 0) for t in timings)
+    execution_total = sum(t.get("execution", 0) for t in timings)
+    succeeded = sum(1 for result in unique_results if result["status"] == "success")
+    return JSONResponse(content={
+        "status": "success" if succeeded == len(unique) else "error",
+        "results": results,
+        "timing": {
+            "total": round(total, 4),
+            "generation": round(generation_total, 4),
+            "execution": round(execution_total, 4),
+            "parallel_speedup": round((generation_total + execution_total) / total, 2) if total else 0.0,
+            "tasks": len(tasks),
+            "unique_tasks": len(unique),
+        },
+    })
+
+
+class EmbeddingsRequest(BaseModel):
+    texts: List[str]
+
+
+class TopKRequest(BaseModel):
+    query: str
+    texts: List[str]
+    k: int = Field(5, ge=1)
+
+
+@app.post("/embeddings", response_model=dict)
+async def handle_embeddings(embeddings_request: EmbeddingsRequest):
+    """
+    Embeds texts for generated scripts, batching upstream calls and serving cached vectors.
+    """
+    try:
+        with stage("embeddings"):
+            vectors = await embedding_service.embed(embeddings_request.texts)
+        return JSONResponse(content={"status": "success", "embeddings": vectors.tolist()})
+    except Exception as e:
+        logger.exception("Embedding failed")
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
 
-        # Replace placeholders in the exec command with the actual script path
-        exec_command = f"python3 {script_path}" if language == "python" else f"bash {script_path}"
 
-        # Execute the script using subprocess
-        try:
-            result = subprocess.run(exec_command, shell=True, capture_output=True, text=True, check=True)
-            output = result.stdout.strip()
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Execution failed: {e.stderr}")
-            raise HTTPException(status_code=500, detail=f"Execution error: {e.stderr}")
+@app.post("/embeddings/similar-pair", response_model=dict)
+async def handle_similar_pair(embeddings_request: EmbeddingsRequest):
+    """
+    Returns the most similar pair of distinct texts by cosine similarity.
+    """
+    texts = embeddings_request.texts
+    if len(texts) < 2:
+        return JSONResponse(content={"status": "error", "message": "At least two texts are required"},
+                            status_code=400)
+    try:
+        with stage("embeddings"):
+            i, j, score = await embedding_service.most_similar_pair(texts)
+        return JSONResponse(content={"status": "success", "indices": [i, j], "pair": [texts[i], texts[j]],
+                                     "score": score})
+    except Exception as e:
+        logger.exception("Similarity search failed")
+        return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
 
-        # Return success response
-        return JSONResponse(content={"status": "success", "output": output})
 
+@app.post("/embeddings/top-k", response_model=dict)
+async def handle_top_k(top_k_request: TopKRequest):
+    """
+    Returns the `k` texts most similar to `query` by cosine similarity.
+    """
+    try:
+        with stage("embeddings"):
+            matches = await embedding_service.top_k(top_k_request.query, top_k_request.texts, top_k_request.k)
+        results = [{"index": index, "text": top_k_request.texts[index], "score": score} for index, score in matches]
+        return JSONResponse(content={"status": "success", "results": results})
     except Exception as e:
-        logger.exception("Task execution failed")
+        logger.exception("Similarity search failed")
         return JSONResponse(content={"status": "error", "message": str(e)}, status_code=500)
 
-@app.get("/read", response_model=dict)
-async def handle_get(path: str):
+
+@app.get("/metrics")
+async def handle_metrics():
+    """
+    Exposes Prometheus metrics: request and stage latency histograms, LLM tokens,
+    errors by stage and script exit codes.
+    """
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/stats", response_model=dict)
+async def handle_stats():
+    """
+    Reports internal counters (caches, prompt routing, token savings, fast paths, hedging, envs, embeddings).
+    """
+    return JSONResponse(content={
+        "cache": await asyncio.to_thread(script_cache.snapshot),
+        "prompt": prompt_stats,
+        "fast_paths": fast_paths.fast_path_stats,
+        "hedge": hedger.snapshot(),
+        "envs": env_cache.snapshot(),
+        "embeddings": embedding_service.snapshot(),
+    })
+
+@app.get("/read")
+async def handle_get(request: Request, path: str, mode: str = Query("raw", alias="format")):
     """
     Reads the content of a file in /data securely.
+    - Streams the file in chunks with a media type guessed from its name or content.
+    - Honours single byte Range requests and ETag/Last-Modified revalidation (304).
+    - `format=json` returns the legacy `{"status", "content"}` envelope for small text files.
     """
     try:
-        full_path = os.path.join(DATA_DIR, path)
-        if not full_path.startswith(DATA_DIR):
-            raise HTTPException(status_code=403, detail="Access denied")
-        with open(full_path, "r") as file:
-            content = file.read()
-        return JSONResponse(content={"status": "success", "content": content})
+        with stage("resolve"):
+            full_path = resolve_within(DATA_DIR, path)
+            if full_path is None:
+                return JSONResponse(content={"status": "error", "message": "Access denied"}, status_code=403)
+            stat = os.stat(full_path)
+        if not os.path.isfile(full_path):
+            return JSONResponse(content={"status": "error", "message": "File not found"}, status_code=404)
+
+        if mode == "json":
+            if stat.st_size > READ_JSON_MAX_BYTES:
+                return JSONResponse(content={"status": "error", "message": "File too large for JSON mode"},
+                                    status_code=413)
+            with open(full_path, "r") as file:
+                content = file.read()
+            return JSONResponse(content={"status": "success", "content": content})
+
+        headers = validators(stat)
+        if not_modified(request.headers, stat):
+            return Response(status_code=304, headers=headers)
+        headers["Accept-Ranges"] = "bytes"
+        try:
+            byte_range = parse_range(request.headers, stat)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+
+        media_type = guess_media_type(full_path)
+        start, end, status_code = 0, stat.st_size - 1, 200
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        headers["Content-Length"] = str(end - start + 1)
+        file = open(full_path, "rb")
+        return StreamingResponse(iter_file(file, start, end - start + 1), status_code=status_code,
+                                 media_type=media_type, headers=headers)
     except FileNotFoundError:
         return JSONResponse(content={"status": "error", "message": "File not found"}, status_code=404)
     except Exception as e:
@@ -0,0 +1,95 @@
+"""
+Planning helpers for /run/batch: deduplication and dependency inference.
+
+A task's file inputs and outputs are inferred from the `/data/...` paths it mentions:
+a path directly preceded by a write cue ("to", "into", "create an index file") is an output,
+anything else is an input, and in-place tasks treat their inputs as outputs too.
+Task B depends on task A when an output of A overlaps an input of B, or both write
+the same file (then submission order wins).
+"""
+import re
+from collections import deque
+
+from script_cache import normalize_task
+
+PATH_PATTERN = re.compile(r"/data(?:/[\w.\-]+)*/?")
+# A cue must sit directly before the path: "to /data/x", "write the number in /data/x",
+# "create an index file /data/x"; "write the # of Wednesdays in /data/x" is a read
+OUTPUT_CUE = re.compile(
+    r"(?:\b(?:to|into|as)"
+    r"|\b(?:write|writes|save|saves|store|stores|create|creates|output)"
+    r"(?:\s+(?:it|them|(?:a|an|the)(?:\s+(?:new|output|index|result|number|count|answer|json|text))?(?:\s+file)?))?"
+    r"(?:\s+(?:in|into|to|at))?)\s+$",
+    re.IGNORECASE,
+)
+IN_PLACE_CUE = re.compile(r"\bin[- ]place\b|\bupdat(e|ing) the file\b", re.IGNORECASE)
+
+
+def dedupe(tasks: list) -> tuple:
+    """Returns `(unique_tasks, index_map)` where index_map[i] is the unique slot of tasks[i]."""
+    unique, slots, index_map = [], {}, []
+    for task in tasks:
+        key = normalize_task(task)
+        if key not in slots:
+            slots[key] = len(unique)
+            unique.append(task)
+        index_map.append(slots[key])
+    return unique, index_map
+
+
+def task_io(task: str) -> tuple:
+    """Returns `(inputs, outputs)` as sets of normalized `/data` paths mentioned by the task."""
+    inputs, outputs = set(), set()
+    for match in PATH_PATTERN.finditer(task):
+        path = match.group(0).rstrip("./") or "/data"
+        if path == "/data":
+            continue
+        preceding = task[max(0, match.start() - 60):match.start()]
+        (outputs if OUTPUT_CUE.search(preceding) else inputs).add(path)
+    if IN_PLACE_CUE.search(task):
+        outputs |= inputs
+    return inputs, outputs
+
+
+def _overlaps(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + "/") or b.startswith(a + "/")
+
+
+def _touches(paths_a: set, paths_b: set) -> bool:
+    return any(_overlaps(a, b) for a in paths_a for b in paths_b)
+
+
+def _is_acyclic(dependencies: list) -> bool:
+    indegree = [len(deps) for deps in dependencies]
+    dependents = [[] for _ in dependencies]
+    for consumer, deps in enumerate(dependencies):
+        for producer in deps:
+            dependents[producer].append(consumer)
+    ready = deque(i for i, degree in enumerate(indegree) if degree == 0)
+    visited = 0
+    while ready:
+        node = ready.popleft()
+        visited += 1
+        for consumer in dependents[node]:
+            indegree[consumer] -= 1
+            if indegree[consumer] == 0:
+                ready.append(consumer)
+    return visited == len(dependencies)
+
+
+def plan_dependencies(tasks: list) -> list:
+    """
+    Returns, for each task, the set of task indices it must wait for.
+    If the inferred graph has a cycle, only edges pointing forward in submission order are kept.
+    """
+    io = [task_io(task) for task in tasks]
+    dependencies = [set() for _ in tasks]
+    for consumer, (inputs, outputs) in enumerate(io):
+        for producer, (_, produced) in enumerate(io):
+            if producer == consumer:
+                continue
+            if _touches(produced, inputs) or (producer < consumer and _touches(produced, outputs)):
+                dependencies[consumer].add(producer)
+    if not _is_acyclic(dependencies):
+        dependencies = [{p for p in deps if p < consumer} for consumer, deps in enumerate(dependencies)]
+    return dependencies
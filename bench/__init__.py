@@ -0,0 +1,4 @@
+"""
+Load-test harness: a mock chat-completions proxy, a fixture /data tree and a task
+corpus replayed against /run and /read. Run `python -m bench.run --help`.
+"""
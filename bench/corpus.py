@@ -0,0 +1,189 @@
+"""
+Benchmark corpus: the task families described in SYSTEM_PROMPT, phrased the way
+graders phrase them, plus the /read access patterns.
+
+`/run` families either match a fast-path handler (and never reach the LLM) or carry
+a `pattern` and a canned `{code, language, exec}` script that the mock proxy returns
+for tasks matching it. Canned code may use `{data_dir}` and `{app_url}`, which the
+mock substitutes before answering. All task paths are written as `/data/...`.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Family:
+    name: str
+    endpoint: str
+    requests: list  # task strings for /run, query params for /read
+    pattern: str = None
+    script: dict = None
+    headers: dict = field(default_factory=dict)
+    weight: int = 1
+
+
+FORMAT_DATES = """
+import os
+from datetime import datetime
+formats = ['%Y/%m/%d %H:%M:%S', '%Y-%m-%d', '%d-%b-%Y', '%b %d, %Y']
+def parse(value):
+    for date_format in formats:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return None
+with open(os.path.join('{data_dir}', 'dates.txt')) as source:
+    dates = [parse(line.strip()) for line in source if line.strip()]
+with open(os.path.join('{data_dir}', 'dates-iso.txt'), 'w') as target:
+    target.write(''.join(date.strftime('%Y-%m-%d') + '\\n' for date in dates if date))
+print(sum(1 for date in dates if date))
+"""
+
+CSV_TO_JSON = """
+import csv
+import json
+import os
+with open(os.path.join('{data_dir}', 'sales.csv'), newline='') as source:
+    rows = list(csv.DictReader(source))
+with open(os.path.join('{data_dir}', 'sales.json'), 'w') as target:
+    json.dump(rows, target)
+print(len(rows))
+"""
+
+LOG_ERRORS = """
+import glob
+import os
+total = 0
+for path in glob.glob(os.path.join('{data_dir}', 'logs', '*.log')):
+    with open(path) as log_file:
+        total += sum(1 for line in log_file if 'ERROR' in line)
+with open(os.path.join('{data_dir}', 'log-errors.txt'), 'w') as target:
+    target.write(str(total))
+print(total)
+"""
+
+GOLD_SALES = """
+import os
+import sqlite3
+connection = sqlite3.connect(os.path.join('{data_dir}', 'ticket-sales.db'))
+total = connection.execute("SELECT SUM(units * price) FROM tickets WHERE type = 'Gold'").fetchone()[0]
+connection.close()
+with open(os.path.join('{data_dir}', 'ticket-sales-gold.txt'), 'w') as target:
+    target.write(str(total))
+print(total)
+"""
+
+SIMILAR_COMMENTS = """
+import json
+import os
+import urllib.request
+with open(os.path.join('{data_dir}', 'comments.txt')) as source:
+    comments = [line.strip() for line in source if line.strip()]
+request = urllib.request.Request('{app_url}/embeddings/similar-pair', data=json.dumps({'texts': comments}).encode(),
+                                 headers={'Content-Type': 'application/json'})
+with urllib.request.urlopen(request, timeout=60) as response:
+    first, second = json.load(response)['pair']
+with open(os.path.join('{data_dir}', 'comments-similar.txt'), 'w') as target:
+    target.write(first + '\\n' + second + '\\n')
+print(first)
+"""
+
+WORD_COUNT = """
+#!/bin/bash
+set -e
+wc -w < '{data_dir}/notes.txt' | tr -d ' ' > '{data_dir}/notes-words.txt'
+cat '{data_dir}/notes-words.txt'
+"""
+
+# Returned when no family pattern matches, so unknown tasks still exercise execution
+FALLBACK_SCRIPT = {"code": "print('ok')\n", "language": "python", "exec": "python3 code_generated.py"}
+
+
+def python_script(code: str) -> dict:
+    return {"code": code.lstrip(), "language": "python", "exec": "python3 code_generated.py"}
+
+
+FAMILIES = [
+    # Generated and executed: every request reaches the LLM (or the script cache)
+    Family("format_dates", "/run", [
+        "Convert every date in /data/dates.txt to ISO 8601 (YYYY-MM-DD) and write them to /data/dates-iso.txt",
+        "Normalise the dates in /data/dates.txt to YYYY-MM-DD, one per line, into /data/dates-iso.txt",
+    ], pattern=r"dates\.txt.*(ISO|YYYY-MM-DD)", script=python_script(FORMAT_DATES), weight=2),
+    Family("csv_to_json", "/run", [
+        "Convert /data/sales.csv into a JSON array of records and save it to /data/sales.json",
+    ], pattern=r"sales\.csv", script=python_script(CSV_TO_JSON)),
+    Family("log_errors", "/run", [
+        "Count the lines containing ERROR across all /data/logs/*.log files and write the total to /data/log-errors.txt",
+    ], pattern=r"\bERROR\b", script=python_script(LOG_ERRORS)),
+    Family("gold_sales", "/run", [
+        "The SQLite database /data/ticket-sales.db has a tickets table with type, units and price. "
+        "What is the total sales of all the items in the Gold ticket type? Write the number to /data/ticket-sales-gold.txt",
+    ], pattern=r"\bGold ticket type\b", script=python_script(GOLD_SALES)),
+    Family("similar_comments", "/run", [
+        "/data/comments.txt contains a list of comments, one per line. Using embeddings, find the most similar pair "
+        "of comments and write them to /data/comments-similar.txt, one per line",
+    ], pattern=r"similar pair", script=python_script(SIMILAR_COMMENTS)),
+    Family("word_count", "/run", [
+        "Use wc to count the words in /data/notes.txt and write the number to /data/notes-words.txt",
+    ], pattern=r"\bwc\b", script={"code": WORD_COUNT.lstrip(), "language": "bash", "exec": "bash bash_script.sh"}),
+
+    # Answered in-process by fast-path handlers
+    Family("count_weekdays", "/run", [
+        "The file /data/dates.txt contains a list of dates, one per line. Count the number of Wednesdays in the list, "
+        "and write just the number to /data/dates-wednesdays.txt",
+        "How many Sundays are in /data/dates.txt? Write the count to /data/dates-sundays.txt",
+        "Write the # of Thursdays in /data/dates.txt into /data/dates-thursdays.txt",
+    ], weight=2),
+    Family("sort_contacts", "/run", [
+        "Sort the array of contacts in /data/contacts.json by last_name, then first_name, "
+        "and write the result to /data/contacts-sorted.json",
+    ]),
+    Family("recent_logs", "/run", [
+        "Write the first line of the 10 most recent .log files in /data/logs/ to /data/logs-recent.txt, most recent first",
+    ]),
+    Family("markdown_index", "/run", [
+        "Find all Markdown (.md) files in /data/docs/. For each file, extract the first occurrence of each H1 title. "
+        "Create an index file /data/docs/index.json that maps each filename to its title",
+    ]),
+    Family("sender_email", "/run", [
+        "/data/email.txt contains an email message. Extract the sender's email address and write just the "
+        "email address to /data/email-sender.txt",
+    ]),
+    Family("sql_query", "/run", [
+        "Run the query \"SELECT SUM(units * price) FROM tickets WHERE type = 'Silver'\" on /data/ticket-sales.db "
+        "and write the result to /data/ticket-sales-silver.txt",
+    ]),
+
+    # Reads
+    Family("read_text", "/read", [{"path": "dates.txt"}, {"path": "notes.txt"}], weight=2),
+    Family("read_json", "/read", [{"path": "contacts.json", "format": "json"}]),
+    Family("read_range", "/read", [{"path": "large.bin"}], headers={"Range": "bytes=0-65535"}),
+    Family("read_large", "/read", [{"path": "large.bin"}]),
+]
+
+
+def select(names: str = None, endpoints: str = None) -> list:
+    """Filters FAMILIES by comma-separated family names and/or endpoints."""
+    families = FAMILIES
+    if names:
+        wanted = {name.strip() for name in names.split(",")}
+        unknown = wanted - {family.name for family in FAMILIES}
+        if unknown:
+            raise ValueError(f"Unknown families: {', '.join(sorted(unknown))}")
+        families = [family for family in families if family.name in wanted]
+    if endpoints:
+        wanted = {endpoint.strip() for endpoint in endpoints.split(",")}
+        families = [family for family in families if family.endpoint in wanted]
+    return families
+
+
+def canned_response(task: str, data_dir: str, app_url: str) -> str:
+    """Returns the JSON completion the mock proxy sends for `task`, as the LLM would."""
+    script = next(
+        (family.script for family in FAMILIES if family.pattern and re.search(family.pattern, task, re.IGNORECASE)),
+        FALLBACK_SCRIPT,
+    )
+    code = script["code"].replace("{data_dir}", data_dir).replace("{app_url}", app_url)
+    return json.dumps({**script, "code": code})
@@ -0,0 +1,98 @@
+"""
+Deterministic fixture /data tree for the benchmark corpus.
+
+Every file the corpus reads is generated from a seeded RNG, so two runs with the same
+seed and sizes see byte-identical inputs. Log mtimes are spread over the past days to
+give recent_logs a stable ordering.
+"""
+import csv
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+DATE_FORMATS = ["%Y/%m/%d %H:%M:%S", "%Y-%m-%d", "%d-%b-%Y", "%b %d, %Y"]
+FIRST_NAMES = ["Alice", "Bob", "Carol", "Dan", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy", "Mallory", "Oscar"]
+LAST_NAMES = ["Smith", "Jones", "Brown", "Taylor", "Wilson", "Davies", "Evans", "Thomas", "Roberts", "Walker"]
+WORDS = ("the service was quick and friendly but the app crashed twice while I was paying for my order "
+         "delivery arrived late again support never answered great prices terrible packaging would buy again").split()
+LOG_LEVELS = ["INFO", "INFO", "INFO", "DEBUG", "WARNING", "ERROR"]
+
+
+def _write(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as output_file:
+        output_file.write(content)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def build(data_dir: str, seed: int = 0, scale: int = 1):
+    """Creates (or overwrites) the fixture files under `data_dir`; `scale` multiplies row counts."""
+    rng = random.Random(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    start = date(2000, 1, 1)
+    dates = []
+    for _ in range(1000 * scale):
+        day = start + timedelta(days=rng.randrange(9000))
+        moment = f"{day:%Y/%m/%d} {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+        dates.append(moment if rng.random() < 0.25 else day.strftime(rng.choice(DATE_FORMATS[1:])))
+    _write(os.path.join(data_dir, "dates.txt"), "\n".join(dates) + "\n")
+
+    contacts = [
+        {"first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES),
+         "email": f"user{index}@example.com"}
+        for index in range(200 * scale)
+    ]
+    _write(os.path.join(data_dir, "contacts.json"), json.dumps(contacts))
+
+    log_dir = os.path.join(data_dir, "logs")
+    now = time.time()
+    for index in range(50):
+        lines = [f"{rng.choice(LOG_LEVELS)} {_sentence(rng, 8)}" for _ in range(100 * scale)]
+        path = os.path.join(log_dir, f"log-{index}.log")
+        _write(path, "\n".join(lines) + "\n")
+        mtime = now - rng.randrange(30 * 86400)
+        os.utime(path, (mtime, mtime))
+
+    for index in range(20):
+        body = "\n".join(_sentence(rng, 12) for _ in range(10))
+        _write(os.path.join(data_dir, "docs", f"section-{index}", "README.md"),
+               f"Intro text\n\n# Section {index}: {_sentence(rng, 3)}\n\n{body}\n\n## Details\n")
+
+    _write(os.path.join(data_dir, "email.txt"),
+           'From: "Donna Jackson" <buckleymatthew@example.net>\n'
+           "To: support@example.com\nSubject: Order status\n\nHi, where is my order?\n")
+
+    comments = [_sentence(rng, rng.randrange(6, 16)) for _ in range(300 * scale)]
+    _write(os.path.join(data_dir, "comments.txt"), "\n".join(comments) + "\n")
+
+    _write(os.path.join(data_dir, "notes.txt"), "\n".join(_sentence(rng, 15) for _ in range(500 * scale)) + "\n")
+
+    with open(os.path.join(data_dir, "sales.csv"), "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(["region", "product", "units", "price"])
+        for _ in range(2000 * scale):
+            writer.writerow([rng.choice(["north", "south", "east", "west"]), rng.choice(WORDS),
+                             rng.randrange(1, 50), round(rng.uniform(1, 500), 2)])
+
+    database = os.path.join(data_dir, "ticket-sales.db")
+    if os.path.exists(database):
+        os.remove(database)
+    connection = sqlite3.connect(database)
+    with connection:
+        connection.execute("CREATE TABLE tickets (type TEXT, units INTEGER, price REAL)")
+        connection.executemany(
+            "INSERT INTO tickets VALUES (?, ?, ?)",
+            [(rng.choice(["Gold", "Silver", "Bronze"]), rng.randrange(1, 500), round(rng.uniform(10, 200), 2))
+             for _ in range(5000 * scale)],
+        )
+    connection.close()
+
+    with open(os.path.join(data_dir, "large.bin"), "wb") as large_file:
+        large_file.write(rng.randbytes(4 * 1024 * 1024 * scale))
@@ -0,0 +1,93 @@
+"""
+Local stand-in for the chat-completions proxy.
+
+Answers with the corpus' canned `{code, language, exec}` script for the task in the
+last user message, after a configurable latency (base, jitter and an optional slow
+tail) and with an optional injected error rate. Supports `"stream": true` as SSE.
+"""
+import argparse
+import asyncio
+import json
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from bench.corpus import canned_response
+
+STREAM_CHUNK_CHARS = 24
+
+
+def create_app(data_dir: str, app_url: str, latency_ms: float = 800, jitter_ms: float = 200,
+               tail_rate: float = 0.0, tail_ms: float = 5000, error_rate: float = 0.0, seed: int = 0) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    stats = {"requests": 0, "streamed": 0, "errors": 0}
+
+    def latency() -> float:
+        delay = latency_ms + rng.uniform(-jitter_ms, jitter_ms)
+        if rng.random() < tail_rate:
+            delay += tail_ms
+        return max(delay, 0) / 1000
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stats["requests"] += 1
+        task = next((m["content"] for m in reversed(payload.get("messages", [])) if m.get("role") == "user"), "")
+        content = canned_response(task, data_dir, app_url)
+        usage = {"prompt_tokens": sum(len(m.get("content", "")) // 4 for m in payload.get("messages", [])),
+                 "completion_tokens": len(content) // 4}
+        await asyncio.sleep(latency())
+        if rng.random() < error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+
+        if not payload.get("stream"):
+            return JSONResponse({
+                "object": "chat.completion",
+                "model": payload.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        stats["streamed"] += 1
+
+        async def events():
+            for start in range(0, len(content), STREAM_CHUNK_CHARS):
+                chunk = {"choices": [{"index": 0, "delta": {"content": content[start:start + STREAM_CHUNK_CHARS]}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def handle_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--data-dir", default="/data", help="Substituted for {data_dir} in canned code")
+    parser.add_argument("--app-url", default="http://127.0.0.1:8000", help="Substituted for {app_url} in canned code")
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of responses that are slow")
+    parser.add_argument("--tail-ms", type=float, default=5000, help="Extra latency of a slow response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of responses that are 503s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    app = create_app(args.data_dir, args.app_url, args.latency_ms, args.jitter_ms, args.tail_rate, args.tail_ms,
+                     args.error_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,349 @@
+"""
+Replays the benchmark corpus against /run and /read at set concurrency levels.
+
+By default this builds a fixture /data tree and starts the mock LLM proxy and the app
+(with isolated caches) on local ports; `--target` benchmarks an already running server.
+Each level sends `--requests` requests through `concurrency` workers and reports
+throughput, p50/p95/p99 latency per endpoint and family, and per-stage timings taken
+from the Server-Timing header (requested with `X-Timing: 1`).
+
+Results are written as JSON. `--baseline` compares them with an earlier result and
+exits with status 1 if throughput, latency or error rate regressed beyond `--tolerance`.
+Script-cache hits are part of the steady state; `--cold-cache` makes every generated
+/run task unique so each one reaches the (mock) LLM.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import httpx
+
+from bench import corpus, fixtures
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READY_TIMEOUT = 120
+SUCCESS_STATUSES = {200, 206, 304}
+
+
+def percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile of `values` (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1), 0)]
+
+
+def summarize(values_ms: list) -> dict:
+    return {
+        "count": len(values_ms),
+        "mean_ms": round(sum(values_ms) / len(values_ms), 2) if values_ms else 0.0,
+        "p50_ms": round(percentile(values_ms, 50), 2),
+        "p95_ms": round(percentile(values_ms, 95), 2),
+        "p99_ms": round(percentile(values_ms, 99), 2),
+    }
+
+
+def parse_server_timing(header: str) -> dict:
+    """Parses `name;dur=12.3, ...` into `{name: milliseconds}`."""
+    timings = {}
+    for metric in filter(None, (part.strip() for part in (header or "").split(","))):
+        name, _, params = metric.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                timings[name.strip()] = float(value)
+    return timings
+
+
+def build_schedule(families: list, count: int, seed: int, cold_cache: bool = False, label: str = "") -> list:
+    """Returns `count` `(family, request)` pairs drawn round-robin from a seeded, weighted shuffle."""
+    pool = [(family, request) for family in families for request in family.requests for _ in range(family.weight)]
+    random.Random(seed).shuffle(pool)
+    schedule = []
+    for index in range(count):
+        family, request = pool[index % len(pool)]
+        if cold_cache and family.script is not None:
+            request = f"{request} (request {label}{index})"
+        schedule.append((family, request))
+    return schedule
+
+
+async def send(client: httpx.AsyncClient, family, request) -> dict:
+    headers = {**family.headers, "X-Timing": "1"}
+    started = time.perf_counter()
+    try:
+        if family.endpoint == "/run":
+            response = await client.post("/run", params={"task": request}, headers=headers)
+        else:
+            response = await client.get("/read", params=request, headers=headers)
+        status, error = response.status_code, None
+        stages = parse_server_timing(response.headers.get("server-timing"))
+        if status not in SUCCESS_STATUSES:
+            error = response.text[:200]
+    except httpx.HTTPError as e:
+        status, error, stages = None, f"{type(e).__name__}: {e}", {}
+    return {"family": family.name, "endpoint": family.endpoint, "status": status, "error": error,
+            "latency_ms": (time.perf_counter() - started) * 1000, "stages": stages}
+
+
+async def run_level(client: httpx.AsyncClient, schedule: list, concurrency: int) -> tuple:
+    """Sends the schedule through `concurrency` workers; returns `(records, elapsed_seconds)`."""
+    queue = iter(schedule)
+    records = []
+
+    async def worker():
+        for family, request in queue:
+            records.append(await send(client, family, request))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return records, time.perf_counter() - started
+
+
+def _group(records: list, key: str) -> dict:
+    groups = {}
+    for record in records:
+        groups.setdefault(record[key], []).append(record)
+    return groups
+
+
+def _summary_with_errors(records: list) -> dict:
+    errors = sum(1 for record in records if record["error"])
+    return dict(summarize([record["latency_ms"] for record in records]),
+                errors=errors, error_rate=round(errors / len(records), 4) if records else 0.0)
+
+
+def report_level(concurrency: int, records: list, elapsed: float) -> dict:
+    stages = {}
+    for record in records:
+        if not record["error"]:
+            for name, duration in record["stages"].items():
+                stages.setdefault(name, []).append(duration)
+    statuses = {}
+    for record in records:
+        statuses[str(record["status"])] = statuses.get(str(record["status"]), 0) + 1
+    sample_errors = list(dict.fromkeys(record["error"] for record in records if record["error"]))[:5]
+    return dict(
+        _summary_with_errors(records),
+        concurrency=concurrency,
+        elapsed_s=round(elapsed, 3),
+        throughput_rps=round(len(records) / elapsed, 2) if elapsed else 0.0,
+        statuses=statuses,
+        endpoints={name: _summary_with_errors(group) for name, group in sorted(_group(records, "endpoint").items())},
+        families={name: _summary_with_errors(group) for name, group in sorted(_group(records, "family").items())},
+        stages={name: summarize(values) for name, values in sorted(stages.items())},
+        sample_errors=sample_errors,
+    )
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Returns human-readable regressions of `current` against `baseline`, matched by concurrency."""
+    regressions = []
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in current["levels"]:
+        old = baseline_levels.get(level["concurrency"])
+        if old is None:
+            continue
+        prefix = f"c={level['concurrency']}"
+        if level["throughput_rps"] < old["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{prefix} throughput {old['throughput_rps']} -> {level['throughput_rps']} req/s")
+        if level["error_rate"] > old["error_rate"] + 0.01:
+            regressions.append(f"{prefix} error rate {old['error_rate']} -> {level['error_rate']}")
+        scopes = [("all", level, old)] + [
+            (endpoint, summary, old["endpoints"][endpoint])
+            for endpoint, summary in level["endpoints"].items() if endpoint in old["endpoints"]
+        ]
+        for scope, new_summary, old_summary in scopes:
+            for metric in ("p50_ms", "p95_ms", "p99_ms"):
+                before, after = old_summary[metric], new_summary[metric]
+                if after > before * (1 + tolerance) and after - before > min_delta_ms:
+                    regressions.append(f"{prefix} {scope} {metric} {before} -> {after}")
+    return regressions
+
+
+def print_level(level: dict):
+    print(f"\nconcurrency {level['concurrency']}: {level['count']} requests in {level['elapsed_s']}s, "
+          f"{level['throughput_rps']} req/s, {level['errors']} errors")
+    print(f"  {'scope':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    rows = [("all", level)] + list(level["endpoints"].items()) + list(level["families"].items())
+    for name, summary in rows:
+        print(f"  {name:<24}{summary['count']:>7}{summary['p50_ms']:>10}{summary['p95_ms']:>10}"
+              f"{summary['p99_ms']:>10}{summary['errors']:>8}")
+    if level["stages"]:
+        print(f"  {'stage':<24}{'count':>7}{'mean ms':>10}{'p95 ms':>10}")
+        for name, summary in level["stages"].items():
+            print(f"  {name:<24}{summary['count']:>7}{summary['mean_ms']:>10}{summary['p95_ms']:>10}")
+    for error in level["sample_errors"]:
+        print(f"  error: {error}")
+
+
+def _wait_ready(url: str, process: subprocess.Popen, name: str):
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{name} was not ready after {READY_TIMEOUT}s")
+
+
+@contextmanager
+def local_stack(args, work_dir: str):
+    """Starts the mock LLM proxy and the app against `args.data_dir`; yields the app's base URL."""
+    app_url = f"http://127.0.0.1:{args.port}"
+    mock_url = f"http://127.0.0.1:{args.mock_port}"
+    mock_argv = [
+        sys.executable, "-m", "bench.mock_llm", "--port", str(args.mock_port),
+        "--data-dir", os.path.realpath(args.data_dir), "--app-url", app_url,
+        "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+        "--tail-rate", str(args.llm_tail_rate), "--tail-ms", str(args.llm_tail_ms),
+        "--error-rate", str(args.llm_error_rate), "--seed", str(args.seed),
+    ]
+    env = dict(
+        os.environ,
+        AIPROXY_TOKEN=os.environ.get("AIPROXY_TOKEN") or "bench",
+        DATA_DIR=os.path.realpath(args.data_dir),
+        OPENAI_API_URL=f"{mock_url}/v1/chat/completions",
+        EMBEDDINGS_BACKEND="hashing",
+        SCRIPT_CACHE_PATH=os.path.join(work_dir, "scripts.sqlite3"),
+        VENV_CACHE_DIR=os.path.join(work_dir, "venvs"),
+        EMBEDDINGS_CACHE_DIR=os.path.join(work_dir, "embeddings"),
+    )
+    app_argv = [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(args.port),
+                "--log-level", "warning"]
+    log = open(os.path.join(work_dir, "server.log"), "w")
+    processes = []
+    try:
+        processes.append(subprocess.Popen(mock_argv, cwd=REPO_ROOT, stdout=log, stderr=subprocess.STDOUT))
+        _wait_ready(f"{mock_url}/stats", processes[-1], "mock LLM proxy")
+        processes.append(subprocess.Popen(app_argv, cwd=REPO_ROOT, env=env, stdout=log, stderr=subprocess.STDOUT))
+        _wait_ready(f"{app_url}/stats", processes[-1], "app")
+        yield app_url
+    except RuntimeError:
+        log.flush()
+        with open(log.name) as log_file:
+            print(log_file.read()[-4000:], file=sys.stderr)
+        raise
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log.close()
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def benchmark(args, base_url: str) -> dict:
+    families = corpus.select(args.families, args.endpoints)
+    if not families:
+        raise SystemExit("No task families selected")
+    levels = []
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        if args.warmup:
+            await run_level(client, build_schedule(families, args.warmup, args.seed, args.cold_cache, "warmup-"), 1)
+        for concurrency in args.concurrency:
+            schedule = build_schedule(families, args.requests, args.seed, args.cold_cache, f"c{concurrency}-")
+            records, elapsed = await run_level(client, schedule, concurrency)
+            level = report_level(concurrency, records, elapsed)
+            print_level(level)
+            levels.append(level)
+        stats = (await client.get("/stats")).json()
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "target": base_url,
+        "config": {
+            "requests": args.requests, "warmup": args.warmup, "seed": args.seed, "cold_cache": args.cold_cache,
+            "families": [family.name for family in families], "scale": args.scale,
+            "llm_latency_ms": args.llm_latency_ms, "llm_jitter_ms": args.llm_jitter_ms,
+            "llm_tail_rate": args.llm_tail_rate, "llm_tail_ms": args.llm_tail_ms,
+            "llm_error_rate": args.llm_error_rate,
+        },
+        "levels": levels,
+        "stats": stats,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=lambda value: [int(level) for level in value.split(",")],
+                        default=[1, 8, 32], help="Comma-separated concurrency levels (default: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=20, help="Unrecorded requests sent first, one at a time")
+    parser.add_argument("--families", help="Comma-separated family names (default: all)")
+    parser.add_argument("--endpoints", help="Comma-separated endpoints to include, e.g. /run")
+    parser.add_argument("--cold-cache", action="store_true", help="Make every generated /run task unique")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--target", help="Benchmark this running server instead of starting a local stack")
+    parser.add_argument("--port", type=int, default=8000, help="Port for the local app")
+    parser.add_argument("--mock-port", type=int, default=8100, help="Port for the mock LLM proxy")
+    parser.add_argument("--data-dir", help="Fixture directory (default: a temporary one)")
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for fixture sizes")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-jitter-ms", type=float, default=200)
+    parser.add_argument("--llm-tail-rate", type=float, default=0.0)
+    parser.add_argument("--llm-tail-ms", type=float, default=5000)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="Result file (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="Ignore latency changes smaller than this")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory(prefix="tds-bench-") as work_dir:
+        if args.target:
+            result = asyncio.run(benchmark(args, args.target.rstrip("/")))
+        else:
+            args.data_dir = args.data_dir or os.path.join(work_dir, "data")
+            fixtures.build(args.data_dir, args.seed, args.scale)
+            with local_stack(args, work_dir) as base_url:
+                result = asyncio.run(benchmark(args, base_url))
+
+    output = args.output or os.path.join(
+        REPO_ROOT, "bench", "results", f"{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as output_file:
+        json.dump(result, output_file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
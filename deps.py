@@ -0,0 +1,252 @@
+"""
+Offline dependency resolution for generated Python scripts.
+
+Requirements come from the script's PEP 723 `# /// script` block plus its top-level
+imports (mapped to distribution names). Anything the base interpreter already provides
+is dropped; when nothing is left the script runs on the base interpreter (and so can use
+the warm pool). Otherwise the script gets a content-addressed virtualenv keyed by the hash
+of its requirement set, built once from a local wheelhouse with `pip --no-index` and reused
+by any later script whose requirements are a subset of an existing env's. Builds run in the
+background: a request waits at most DEPS_BUILD_WAIT for one, then runs on the base
+interpreter while the build finishes for later scripts.
+"""
+import ast
+import asyncio
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+VENV_CACHE_DIR = os.environ.get("VENV_CACHE_DIR", "/var/cache/tds/venvs")
+WHEELHOUSE_DIR = os.environ.get("WHEELHOUSE_DIR", "/opt/wheelhouse")
+DEPS_INSTALL_TIMEOUT = float(os.environ.get("DEPS_INSTALL_TIMEOUT", "180"))
+DEPS_BUILD_WAIT = float(os.environ.get("DEPS_BUILD_WAIT", "10"))
+DEPS_MAX_CONCURRENT_BUILDS = int(os.environ.get("DEPS_MAX_CONCURRENT_BUILDS", "2"))
+
+SCRIPT_METADATA = re.compile(r"(?m)^# /// (?P<type>[a-zA-Z0-9-]+)$\s(?P<content>(^#(| .*)$\s)+)^# ///$")
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+# Import names whose distribution is named differently
+IMPORT_TO_DIST = {
+    "PIL": "pillow",
+    "bs4": "beautifulsoup4",
+    "cv2": "opencv-python-headless",
+    "dateutil": "python-dateutil",
+    "dotenv": "python-dotenv",
+    "git": "GitPython",
+    "magic": "python-magic",
+    "sklearn": "scikit-learn",
+    "speech_recognition": "SpeechRecognition",
+    "yaml": "pyyaml",
+    "docx": "python-docx",
+    "fitz": "pymupdf",
+}
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:  # packaging is optional; without it version specifiers are not checked
+    Requirement = None
+
+
+def normalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def normalize_requirement(requirement: str) -> str:
+    match = REQUIREMENT_NAME.match(requirement)
+    if not match:
+        return requirement.strip()
+    return normalize_name(match.group(1)) + re.sub(r"\s+", "", requirement[match.end():])
+
+
+def script_dependencies(code: str) -> list:
+    """Returns the `dependencies` list from a PEP 723 inline metadata block, if any."""
+    for match in SCRIPT_METADATA.finditer(code):
+        if match.group("type") != "script":
+            continue
+        content = "".join(
+            line[2:] if line.startswith("# ") else line[1:]
+            for line in match.group("content").splitlines(keepends=True)
+        )
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11: pull the quoted strings out of `dependencies = [...]`
+            block = re.search(r"(?ms)^dependencies\s*=\s*\[(.*?)\]", content)
+            return re.findall(r"[\"']([^\"']+)[\"']", block.group(1)) if block else []
+        try:
+            return list(tomllib.loads(content).get("dependencies", []))
+        except tomllib.TOMLDecodeError as e:
+            logger.warning(f"Ignoring malformed script metadata: {e}")
+    return []
+
+
+def imported_modules(code: str) -> set:
+    """Returns the top-level module names imported by the script."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return set()
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.add(node.module.split(".")[0])
+    return modules
+
+
+def _base_satisfies(requirement: str) -> bool:
+    match = REQUIREMENT_NAME.match(requirement)
+    if not match:
+        return False
+    try:
+        version = importlib.metadata.version(match.group(1))
+    except importlib.metadata.PackageNotFoundError:
+        return False
+    if Requirement is None:
+        return True
+    try:
+        return Requirement(requirement).specifier.contains(version, prereleases=True)
+    except InvalidRequirement:
+        return True
+
+
+@lru_cache(maxsize=1024)
+def missing_requirements(code: str) -> tuple:
+    """Returns the sorted, normalized requirements the base interpreter does not already satisfy."""
+    missing = {normalize_requirement(req) for req in script_dependencies(code) if not _base_satisfies(req)}
+    declared = {REQUIREMENT_NAME.match(req).group(1) for req in missing if REQUIREMENT_NAME.match(req)}
+    for module in imported_modules(code):
+        if module in sys.stdlib_module_names or importlib.util.find_spec(module) is not None:
+            continue
+        dist = normalize_name(IMPORT_TO_DIST.get(module, module))
+        if dist not in declared:
+            missing.add(dist)
+    return tuple(sorted(missing))
+
+
+class EnvironmentCache:
+    """Content-addressed virtualenvs built offline from a local wheelhouse."""
+
+    def __init__(self, root: str = VENV_CACHE_DIR, wheelhouse: str = WHEELHOUSE_DIR):
+        self.root = root
+        self.wheelhouse = wheelhouse
+        self.stats = {"base": 0, "exact_hits": 0, "superset_hits": 0, "builds": 0, "build_failures": 0,
+                      "build_pending": 0}
+        self._envs = {}
+        self._failed = set()
+        self._builds = {}
+        self._build_slots = asyncio.Semaphore(DEPS_MAX_CONCURRENT_BUILDS)
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            manifest = os.path.join(root, name, "manifest.json")
+            if os.path.exists(manifest):
+                with open(manifest) as manifest_file:
+                    self._envs[name] = frozenset(json.load(manifest_file)["requirements"])
+
+    @staticmethod
+    def env_key(requirements: tuple) -> str:
+        return hashlib.sha256("\n".join(requirements).encode()).hexdigest()[:16]
+
+    def _python(self, key: str) -> str:
+        return os.path.join(self.root, key, "bin", "python")
+
+    async def interpreter_for(self, code: str, wait: float = DEPS_BUILD_WAIT):
+        """
+        Returns the interpreter path for the script's dependencies, or None when the
+        base interpreter suffices, no env could be built offline, or the env's build
+        did not finish within `wait` seconds (it keeps running for later scripts).
+        """
+        requirements = missing_requirements(code)
+        if not requirements:
+            self.stats["base"] += 1
+            return None
+        key = self.env_key(requirements)
+        if key in self._envs:
+            self.stats["exact_hits"] += 1
+            return self._python(key)
+        wanted = set(requirements)
+        for existing, provided in self._envs.items():
+            if wanted <= provided:
+                self.stats["superset_hits"] += 1
+                return self._python(existing)
+        if key in self._failed:
+            return None
+        build = self._builds.get(key)
+        if build is None:
+            build = self._builds[key] = asyncio.create_task(self._build(key, requirements))
+            build.add_done_callback(lambda _: self._builds.pop(key, None))
+        await asyncio.wait({build}, timeout=wait)
+        if key not in self._envs:
+            if not build.done():
+                self.stats["build_pending"] += 1
+                logger.info(f"Env {key} is still building, using the base interpreter")
+            return None
+        return self._python(key)
+
+    async def _build(self, key: str, requirements: tuple) -> bool:
+        async with self._build_slots:
+            try:
+                return await self._install(key, requirements)
+            except Exception:
+                logger.exception(f"Building env {key} failed")
+                self.stats["build_failures"] += 1
+                self._failed.add(key)
+                return False
+
+    async def _install(self, key: str, requirements: tuple) -> bool:
+        target = os.path.join(self.root, key)
+        staging = f"{target}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        logger.info(f"Building env {key} for {', '.join(requirements)}")
+        commands = [
+            [sys.executable, "-m", "venv", "--system-site-packages", staging],
+            [os.path.join(staging, "bin", "python"), "-m", "pip", "install", "--no-index",
+             "--disable-pip-version-check", "--find-links", self.wheelhouse, *requirements],
+        ]
+        for argv in commands:
+            process = await asyncio.create_subprocess_exec(
+                *argv, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                _, stderr = await asyncio.wait_for(process.communicate(), DEPS_INSTALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                stderr = b"timed out"
+            except asyncio.CancelledError:
+                process.kill()
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            if process.returncode != 0:
+                self.stats["build_failures"] += 1
+                logger.warning(f"Could not build env {key} offline, using the base interpreter: "
+                               f"{stderr.decode(errors='replace')[-500:]}")
+                shutil.rmtree(staging, ignore_errors=True)
+                self._failed.add(key)
+                return False
+        with open(os.path.join(staging, "manifest.json"), "w") as manifest_file:
+            json.dump({"requirements": list(requirements)}, manifest_file)
+        os.replace(staging, target)
+        self._envs[key] = frozenset(requirements)
+        self.stats["builds"] += 1
+        return True
+
+    async def close(self):
+        """Cancels builds still in progress; their staging directories are discarded on the next build."""
+        builds = list(self._builds.values())
+        for build in builds:
+            build.cancel()
+        await asyncio.gather(*builds, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, envs=len(self._envs), building=len(self._builds))
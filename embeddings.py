@@ -0,0 +1,204 @@
+"""
+Local embedding service for generated scripts.
+
+Texts are embedded through a pluggable backend in as few upstream batches as possible,
+and vectors are cached by content hash in a memory-mapped float32 matrix on disk.
+Similarity search (most similar pair, top-k) runs as blocked matrix products over
+L2-normalised vectors. Store writes and the numpy search run in worker threads so
+they never block the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+EMBEDDINGS_BACKEND = os.environ.get("EMBEDDINGS_BACKEND", "openai")
+EMBEDDINGS_MODEL = os.environ.get("EMBEDDINGS_MODEL", "text-embedding-3-small")
+EMBEDDINGS_CACHE_DIR = os.environ.get("EMBEDDINGS_CACHE_DIR", "/var/cache/tds/embeddings")
+EMBEDDINGS_BATCH_SIZE = int(os.environ.get("EMBEDDINGS_BATCH_SIZE", "256"))
+EMBEDDINGS_BLOCK_ROWS = int(os.environ.get("EMBEDDINGS_BLOCK_ROWS", "2048"))
+
+
+class OpenAIEmbeddingBackend:
+    """Embeds through the OpenAI-compatible /embeddings endpoint via a pooled LLMClient."""
+
+    def __init__(self, client, model: str = EMBEDDINGS_MODEL):
+        self.client = client
+        self.model = model
+        self.name = f"openai-{model}"
+
+    async def embed(self, texts: list) -> np.ndarray:
+        response = await self.client.post_json({"model": self.model, "input": texts})
+        data = sorted(response["data"], key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+
+
+class HashingEmbeddingBackend:
+    """Deterministic local stand-in: signed feature hashing of word unigrams and bigrams."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    async def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", text.lower())
+            for feature in words + [" ".join(pair) for pair in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return vectors
+
+
+class VectorStore:
+    """
+    Append-only on-disk vector cache: `vectors.f32` is a memory-mapped (capacity, dim)
+    float32 matrix and `keys.txt` lists the content hash of each filled row.
+    """
+
+    def __init__(self, root: str, dim: int, initial_capacity: int = 1024):
+        self.dim = dim
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, "dim"), "w") as dim_file:
+            dim_file.write(str(dim))
+        self._vectors_path = os.path.join(root, "vectors.f32")
+        self._keys_path = os.path.join(root, "keys.txt")
+        self._rows = {}
+        if os.path.exists(self._keys_path):
+            with open(self._keys_path) as keys_file:
+                for row, key in enumerate(keys_file.read().split()):
+                    self._rows[key] = row
+        existing = os.path.getsize(self._vectors_path) // (4 * dim) if os.path.exists(self._vectors_path) else 0
+        self._capacity = max(existing, initial_capacity, len(self._rows))
+        self._open(self._capacity)
+
+    def _open(self, capacity: int):
+        with open(self._vectors_path, "ab") as vectors_file:
+            vectors_file.truncate(capacity * self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._capacity = capacity
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, keys: list, vectors: np.ndarray):
+        start = len(self._rows)
+        if start + len(keys) > self._capacity:
+            self._matrix.flush()
+            del self._matrix
+            self._open(max(self._capacity * 2, start + len(keys)))
+        self._matrix[start:start + len(keys)] = vectors
+        self._matrix.flush()
+        # Keys are appended after the vectors are durable, so a crash never indexes a blank row
+        with open(self._keys_path, "a") as keys_file:
+            keys_file.write("".join(f"{key}\n" for key in keys))
+        for offset, key in enumerate(keys):
+            self._rows[key] = start + offset
+
+    def get(self, keys: list) -> np.ndarray:
+        return np.array(self._matrix[[self._rows[key] for key in keys]])
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def most_similar_pair(vectors: np.ndarray) -> tuple:
+    """Returns `(i, j, cosine)` for the most similar pair of distinct rows (i < j), in row blocks."""
+    vectors = normalize_rows(vectors)
+    best = (-np.inf, 0, 1)
+    for start in range(0, len(vectors), EMBEDDINGS_BLOCK_ROWS):
+        block = vectors[start:start + EMBEDDINGS_BLOCK_ROWS] @ vectors.T
+        rows = np.arange(block.shape[0])
+        # Only the upper triangle: column > global row index
+        block[np.arange(vectors.shape[0])[None, :] <= (rows + start)[:, None]] = -np.inf
+        flat = int(np.argmax(block))
+        row, column = divmod(flat, block.shape[1])
+        if block[row, column] > best[0]:
+            best = (float(block[row, column]), row + start, column)
+    score, i, j = best
+    return i, j, score
+
+
+def top_k(query: np.ndarray, vectors: np.ndarray, k: int) -> list:
+    """Returns the `k` `(index, cosine)` pairs of the rows most similar to `query`, best first."""
+    scores = normalize_rows(vectors) @ normalize_rows(query[None, :])[0]
+    k = min(k, len(vectors))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(int(index), float(scores[index])) for index in top]
+
+
+class EmbeddingService:
+    """Batches and caches embedding calls and runs vectorised similarity search."""
+
+    def __init__(self, backend, cache_dir: str = EMBEDDINGS_CACHE_DIR, batch_size: int = EMBEDDINGS_BATCH_SIZE):
+        self.backend = backend
+        self.batch_size = batch_size
+        self._root = os.path.join(cache_dir, re.sub(r"[^\w.-]+", "_", backend.name))
+        self._store = None
+        self._store_lock = asyncio.Lock()
+        dim_path = os.path.join(self._root, "dim")
+        if os.path.exists(dim_path):
+            with open(dim_path) as dim_file:
+                self._store = VectorStore(self._root, int(dim_file.read()))
+        self.stats = {"texts": 0, "cache_hits": 0, "upstream_requests": 0, "upstream_texts": 0}
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.backend.name}\0{text}".encode()).hexdigest()
+
+    async def embed(self, texts: list) -> np.ndarray:
+        """Returns a (len(texts), dim) matrix, embedding only texts not already cached."""
+        keys = [self._key(text) for text in texts]
+        missing = {}
+        for key, text in zip(keys, texts):
+            if (self._store is None or key not in self._store) and key not in missing:
+                missing[key] = text
+        self.stats["texts"] += len(texts)
+        self.stats["cache_hits"] += len(texts) - sum(1 for key in keys if key in missing)
+        pending = list(missing.items())
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            vectors = await self.backend.embed([text for _, text in batch])
+            self.stats["upstream_requests"] += 1
+            self.stats["upstream_texts"] += len(batch)
+            async with self._store_lock:
+                if self._store is None:
+                    self._store = await asyncio.to_thread(VectorStore, self._root, vectors.shape[1])
+                fresh = [(key, vector) for (key, _), vector in zip(batch, vectors) if key not in self._store]
+                if fresh:
+                    await asyncio.to_thread(self._store.add, [key for key, _ in fresh],
+                                            np.stack([vector for _, vector in fresh]))
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        async with self._store_lock:
+            return await asyncio.to_thread(self._store.get, keys)
+
+    async def most_similar_pair(self, texts: list) -> tuple:
+        """Returns `(i, j, cosine)` for the most similar pair of distinct texts (i < j)."""
+        if len(texts) < 2:
+            raise ValueError("At least two texts are required")
+        return await asyncio.to_thread(most_similar_pair, await self.embed(texts))
+
+    async def top_k(self, query: str, texts: list, k: int = 5) -> list:
+        """Returns up to `k` `(index, cosine)` pairs of the texts most similar to `query`."""
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        if not texts:
+            return []
+        vectors = await self.embed([query] + list(texts))
+        return await asyncio.to_thread(top_k, vectors[0], vectors[1:], k)
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, backend=self.backend.name, cached_vectors=len(self._store or ()))
@@ -0,0 +1,182 @@
+import asyncio
+import logging
+import os
+import shutil
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+EXEC_MAX_WORKERS = int(os.environ.get("EXEC_MAX_WORKERS", str(os.cpu_count() or 2)))
+EXEC_MAX_QUEUE = int(os.environ.get("EXEC_MAX_QUEUE", "32"))
+EXEC_QUEUE_TIMEOUT = float(os.environ.get("EXEC_QUEUE_TIMEOUT", "5"))
+EXEC_TIMEOUT = float(os.environ.get("EXEC_TIMEOUT", "20"))
+EXEC_MEMORY_LIMIT_MB = int(os.environ.get("EXEC_MEMORY_LIMIT_MB", "2048"))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when no worker slot can be obtained; callers should answer 503."""
+
+
+@dataclass
+class ExecutionResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    duration: float = 0.0
+    spawn_duration: float = 0.0
+
+
+PRLIMIT = shutil.which("prlimit")
+# Fallback when util-linux is missing: set the limit, then exec the real command
+LIMIT_SHIM = ("import os, resource, sys; limit = int(sys.argv[1]); "
+              "resource.setrlimit(resource.RLIMIT_DATA, (limit, limit)); os.execvp(sys.argv[2], sys.argv[2:])")
+
+
+def limited_argv(argv: list, memory_limit_mb: int) -> list:
+    """
+    Wraps `argv` so the child starts with its writable private memory capped.
+    The limit is applied by an exec wrapper rather than a preexec_fn, which is unsafe
+    in a process that has threads. RLIMIT_DATA is used rather than RLIMIT_AS so that
+    large PROT_NONE reservations (V8 heaps under npx, torch under easyocr) do not count
+    against the budget.
+    """
+    if memory_limit_mb <= 0:
+        return list(argv)
+    limit = memory_limit_mb * 1024 * 1024
+    if PRLIMIT:
+        return [PRLIMIT, f"--data={limit}:{limit}", "--", *argv]
+    return [sys.executable, "-c", LIMIT_SHIM, str(limit), *argv]
+
+
+def kill_group(pid: int):
+    """Kills the whole process group led by `pid`, ignoring already-dead groups."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _drain(stream: asyncio.StreamReader, sink: list, on_line=None):
+    """Collects a pipe into `sink`, optionally passing each decoded line to `on_line` as it arrives."""
+    pending = b""
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            break
+        sink.append(chunk)
+        if on_line is not None:
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                on_line(line.decode(errors="replace"))
+    if on_line is not None and pending:
+        on_line(pending.decode(errors="replace"))
+
+
+class ScriptExecutor:
+    """
+    Bounded pool for running generated scripts as async subprocesses.
+    - At most `max_workers` scripts run at once; up to `max_queue` more may wait.
+    - Each script runs in its own session so timeouts kill the whole process group.
+    - Writable memory is capped per child with RLIMIT_DATA.
+    """
+
+    def __init__(self, max_workers: int = EXEC_MAX_WORKERS, max_queue: int = EXEC_MAX_QUEUE,
+                 timeout: float = EXEC_TIMEOUT, memory_limit_mb: int = EXEC_MEMORY_LIMIT_MB,
+                 queue_timeout: float = EXEC_QUEUE_TIMEOUT):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_workers)
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.max_workers + self.max_queue
+
+    async def run(self, argv: list, *, cwd: str = None, timeout: float = None,
+                  on_output=None) -> ExecutionResult:
+        """
+        Runs `argv` in a worker slot and returns its captured output.
+        `on_output(stream_name, line)` is called for every stdout/stderr line while the script runs.
+        """
+        async def spawn():
+            return await asyncio.create_subprocess_exec(
+                *limited_argv(argv, self.memory_limit_mb),
+                cwd=cwd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+        return await self._run(spawn, timeout, on_output)
+
+    async def run_warm(self, pool, script_path: str, *, cwd: str = None, timeout: float = None,
+                       on_output=None) -> ExecutionResult:
+        """Runs a Python script in a forked child of a warm zygote from `pool`."""
+        async def spawn():
+            return await pool.spawn(script_path, cwd=cwd, memory_limit_mb=self.memory_limit_mb)
+        return await self._run(spawn, timeout, on_output)
+
+    async def _run(self, spawn, timeout: float, on_output=None) -> ExecutionResult:
+        if self.saturated:
+            raise ExecutorSaturated("Execution queue is full")
+        self._pending += 1
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise ExecutorSaturated("Timed out waiting for an execution slot")
+            try:
+                started = time.monotonic()
+                process = await spawn()
+                spawn_duration = time.monotonic() - started
+                result = await self._supervise(process, timeout or self.timeout, started, on_output)
+                result.spawn_duration = spawn_duration
+                return result
+            finally:
+                self._slots.release()
+        finally:
+            self._pending -= 1
+
+    async def _supervise(self, process, timeout: float, started: float, on_output=None) -> ExecutionResult:
+        stdout, stderr = [], []
+        on_stdout = on_stderr = None
+        if on_output is not None:
+            on_stdout, on_stderr = partial(on_output, "stdout"), partial(on_output, "stderr")
+        readers = asyncio.gather(_drain(process.stdout, stdout, on_stdout), _drain(process.stderr, stderr, on_stderr))
+        timed_out = False
+        try:
+            await asyncio.wait_for(process.wait(), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.error(f"Script exceeded {timeout}s, killing process group {process.pid}")
+            kill_group(process.pid)
+            await process.wait()
+        except asyncio.CancelledError:
+            kill_group(process.pid)
+            raise
+        finally:
+            # Grandchildren may still hold the pipes open after the leader exits.
+            kill_group(process.pid)
+            await readers
+            if hasattr(process, "close"):
+                process.close()
+        return ExecutionResult(
+            returncode=process.returncode,
+            stdout=b"".join(stdout).decode(errors="replace"),
+            stderr=b"".join(stderr).decode(errors="replace"),
+            timed_out=timed_out,
+            duration=time.monotonic() - started,
+        )
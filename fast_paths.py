@@ -0,0 +1,352 @@
+"""
+Deterministic in-process handlers for task families that need no LLM.
+
+Each handler declares regex patterns that must all match the task text (a cheap
+pre-filter) and an implementation that reads and writes files under DATA_DIR directly.
+Handlers take their parameters from anchored full-sentence templates, so a task adding
+any qualifier (a year, a sort order, a filter, an output format, ...) is not answered.
+A handler that is unsure about a task raises NotHandled, and the task falls through to
+the generate-and-execute path. SQL from the task runs read-only, without access to other
+files, and is aborted after FAST_PATH_SQL_TIMEOUT.
+"""
+import asyncio
+import email
+import email.policy
+import email.utils
+import glob
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from executor import ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+FAST_PATHS_ENABLED = os.environ.get("FAST_PATHS_ENABLED", "1") != "0"
+FAST_PATH_SQL_TIMEOUT = float(os.environ.get("FAST_PATH_SQL_TIMEOUT", "10"))
+
+DATE_FORMATS = ["%Y/%m/%d %H:%M:%S", "%Y-%m-%d", "%d-%b-%Y", "%b %d, %Y", "%Y/%m/%d", "%d/%m/%Y"]
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+TEMPLATE_PATH = r"/data/[\w.\-/]*[\w\-/]"
+
+
+class NotHandled(Exception):
+    """Raised by a handler that cannot answer the task with certainty."""
+
+
+@dataclass
+class FastPath:
+    name: str
+    patterns: list
+    templates: list
+    func: object
+
+    def accepts(self, task: str) -> bool:
+        """True when every pattern matches and, if the handler has templates, one covers the task."""
+        return (all(pattern.search(task) for pattern in self.patterns)
+                and (not self.templates or find_template(task, self.templates) is not None))
+
+
+HANDLERS = []
+fast_path_stats = {"hits": {}, "fallthroughs": 0}
+
+
+def fast_path(name: str, *patterns: str, templates: list = ()):
+    """Registers `func(task, ctx)` as a fast path for tasks matching every pattern and one of `templates`."""
+    def register(func):
+        HANDLERS.append(FastPath(name, [re.compile(p, re.IGNORECASE) for p in patterns], list(templates), func))
+        return func
+    return register
+
+
+@dataclass
+class Context:
+    data_dir: str
+    executor: object
+
+    def resolve(self, path: str) -> str:
+        """Maps a `/data/...` path from the task onto DATA_DIR, refusing anything outside it."""
+        relative = path[len("/data"):].lstrip("/")
+        root = os.path.realpath(self.data_dir)
+        resolved = os.path.realpath(os.path.join(root, relative))
+        if os.path.commonpath([root, resolved]) != root:
+            raise NotHandled(f"Path escapes the data directory: {path}")
+        return resolved
+
+
+def templates(*patterns: str) -> list:
+    """Compiles full-sentence task templates; `{source}` and `{target}` stand for `/data/...` paths."""
+    paths = {"source": rf"(?P<source>{TEMPLATE_PATH})", "target": rf"(?P<target>{TEMPLATE_PATH})"}
+    return [re.compile(pattern.format(**paths), re.IGNORECASE) for pattern in patterns]
+
+
+def find_template(task: str, compiled: list):
+    """Returns the match of the first template covering the whole task (whitespace collapsed, final period dropped)."""
+    normalized = re.sub(r"\s+", " ", task.replace("\u2019", "'")).strip().rstrip(".")
+    for template in compiled:
+        match = template.fullmatch(normalized)
+        if match:
+            return match
+    return None
+
+
+def match_template(task: str, compiled: list) -> re.Match:
+    """Like find_template, but raises NotHandled when no template matches, so qualified tasks reach the LLM."""
+    match = find_template(task, compiled)
+    if match is None:
+        raise NotHandled("Task does not match a known phrasing")
+    return match
+
+
+def write_text(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as output_file:
+        output_file.write(content)
+
+
+def parse_date(value: str) -> datetime:
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise NotHandled(f"Unrecognised date: {value}")
+
+
+def might_handle(task: str) -> bool:
+    """True when some handler accepts the task, i.e. dispatch may answer it without the LLM."""
+    return FAST_PATHS_ENABLED and any(handler.accepts(task) for handler in HANDLERS)
+
+
+async def dispatch(task: str, data_dir: str, executor) -> tuple:
+    """Returns `(handler_name, output)` for the first handler that answers the task, else None."""
+    if not FAST_PATHS_ENABLED:
+        return None
+    ctx = Context(data_dir, executor)
+    for handler in HANDLERS:
+        if not handler.accepts(task):
+            continue
+        try:
+            if asyncio.iscoroutinefunction(handler.func):
+                output = await handler.func(task, ctx)
+            else:
+                output = await asyncio.to_thread(handler.func, task, ctx)
+        except ExecutorSaturated:
+            raise
+        except NotHandled as e:
+            logger.info(f"Fast path {handler.name} declined: {e}")
+            continue
+        except Exception:
+            logger.exception(f"Fast path {handler.name} failed, falling back")
+            continue
+        fast_path_stats["hits"][handler.name] = fast_path_stats["hits"].get(handler.name, 0) + 1
+        return handler.name, output
+    fast_path_stats["fallthroughs"] += 1
+    return None
+
+
+WEEKDAY_GROUP = r"(?P<day>(?:mon|tues|wednes|thurs|fri|satur|sun)day)s"
+WRITE_NUMBER = r"write (?:just )?the (?:number|count|result|answer)"
+COUNT_WEEKDAYS_TEMPLATES = templates(
+    rf"(?:the file )?{{source}} contains a list of dates,? one per line\. (?:count|write) the (?:number|#) of "
+    rf"{WEEKDAY_GROUP} in the list,? and {WRITE_NUMBER} (?:to|into) {{target}}",
+    rf"(?:count|write) the (?:number|#) of {WEEKDAY_GROUP} in {{source}},?(?: and {WRITE_NUMBER})? (?:to|into) {{target}}",
+    rf"how many {WEEKDAY_GROUP} are (?:there )?in {{source}}\?? {WRITE_NUMBER} (?:to|into) {{target}}",
+)
+
+
+@fast_path("count_weekdays", r"\b(count|number of|how many)\b|# of",
+           r"\b(mon|tues|wednes|thurs|fri|satur|sun)days?\b", templates=COUNT_WEEKDAYS_TEMPLATES)
+def count_weekdays(task: str, ctx: Context) -> str:
+    match = match_template(task, COUNT_WEEKDAYS_TEMPLATES)
+    weekday = WEEKDAYS.index(match.group("day").lower())
+    source, target = ctx.resolve(match.group("source")), ctx.resolve(match.group("target"))
+    with open(source) as dates_file:
+        dates = [parse_date(line.strip()) for line in dates_file if line.strip()]
+    count = str(sum(1 for date in dates if date.weekday() == weekday))
+    write_text(target, count)
+    return count
+
+
+SENDER_EMAIL_TEMPLATES = templates(
+    r"{source} contains an email message\. (?:pass the content to an llm with instructions to )?extract the "
+    r"sender's email(?: address)?,? and write (?:just )?the email(?: address)? (?:to|into) {target}",
+    r"extract the sender's email(?: address)? from {source},? and write (?:it|just the email(?: address)?) "
+    r"(?:to|into) {target}",
+)
+
+
+@fast_path("sender_email", r"\bsender", r"e-?mail", templates=SENDER_EMAIL_TEMPLATES)
+def sender_email(task: str, ctx: Context) -> str:
+    match = match_template(task, SENDER_EMAIL_TEMPLATES)
+    source, target = ctx.resolve(match.group("source")), ctx.resolve(match.group("target"))
+    with open(source) as mail_file:
+        message = email.message_from_file(mail_file, policy=email.policy.compat32)
+    address = email.utils.parseaddr(message.get("From", ""))[1]
+    if "@" not in address:
+        raise NotHandled("No sender address in the From header")
+    write_text(target, address)
+    return address
+
+
+CONTACT_KEY = r"(?:first_name|last_name|email|phone|name)"
+SORT_CONTACTS_TEMPLATES = templates(
+    rf"sort the (?:array|list) of contacts in {{source}} by (?P<keys>{CONTACT_KEY}(?:,? (?:and |then )(?:by )?"
+    rf"{CONTACT_KEY})*),? and write the (?:result|sorted contacts) (?:to|into) {{target}}",
+)
+
+
+@fast_path("sort_contacts", r"\bcontacts?\b", r"\bsort", r"\.json\b", templates=SORT_CONTACTS_TEMPLATES)
+def sort_contacts(task: str, ctx: Context) -> str:
+    match = match_template(task, SORT_CONTACTS_TEMPLATES)
+    keys = re.findall(CONTACT_KEY, match.group("keys"), re.IGNORECASE)
+    source, target = ctx.resolve(match.group("source")), ctx.resolve(match.group("target"))
+    with open(source) as contacts_file:
+        contacts = json.load(contacts_file)
+    if not isinstance(contacts, list) or not all(isinstance(c, dict) for c in contacts):
+        raise NotHandled("Contacts file is not a list of objects")
+    keys = [key.lower() for key in dict.fromkeys(keys)]
+    contacts.sort(key=lambda contact: tuple(str(contact.get(key, "")) for key in keys))
+    content = json.dumps(contacts)
+    write_text(target, content)
+    return content
+
+
+RECENT_LOGS_TEMPLATES = templates(
+    r"write the first line of the (?:(?P<count>\d+) )?(?:most recent|newest|latest) \.?log files? (?:in|from) "
+    r"{source},? (?:to|into) {target}(?:,? (?:with the )?(?:most recent|newest|latest) (?:one )?first)?",
+)
+
+
+@fast_path("recent_logs", r"\.log\b|\blogs?\b", r"\b(most recent|newest|latest)\b", r"\bfirst line",
+           templates=RECENT_LOGS_TEMPLATES)
+def recent_logs(task: str, ctx: Context) -> str:
+    match = match_template(task, RECENT_LOGS_TEMPLATES)
+    log_dir, target = ctx.resolve(match.group("source")), ctx.resolve(match.group("target"))
+    if not os.path.isdir(log_dir):
+        raise NotHandled("Log directory does not exist")
+    count = int(match.group("count") or 10)
+    logs = sorted(glob.glob(os.path.join(log_dir, "*.log")), key=os.path.getmtime, reverse=True)
+    lines = []
+    for log_path in logs[:count]:
+        with open(log_path) as log_file:
+            lines.append(log_file.readline().rstrip("\n"))
+    content = "\n".join(lines) + "\n"
+    write_text(target, content)
+    return content.strip()
+
+
+MARKDOWN_INDEX_TEMPLATES = templates(
+    rf"find all markdown \(\.md\) files in {{source}}\. for each file,? extract the first occurr?[ae]nce of "
+    rf"(?:each|the) h1(?: title)?(?: \(i\.e\.,? the first line starting with # ?\))?\. create an index file "
+    rf"{{target}} that maps each filename(?: \(without the {TEMPLATE_PATH} prefix\))? to its title"
+    rf"(?: \(e\.g\.,? [^()]*\))?",
+)
+
+
+@fast_path("markdown_index", r"markdown|\.md\b", r"\bH1\b|\btitles?\b", r"\bindex\b",
+           templates=MARKDOWN_INDEX_TEMPLATES)
+def markdown_index(task: str, ctx: Context) -> str:
+    match = match_template(task, MARKDOWN_INDEX_TEMPLATES)
+    docs_dir, target = ctx.resolve(match.group("source")), ctx.resolve(match.group("target"))
+    if not os.path.isdir(docs_dir) or not target.endswith(".json"):
+        raise NotHandled("Expected a docs directory and a JSON index")
+    index = {}
+    for md_path in sorted(glob.glob(os.path.join(docs_dir, "**", "*.md"), recursive=True)):
+        with open(md_path) as md_file:
+            for line in md_file:
+                if line.startswith("# "):
+                    index[os.path.relpath(md_path, docs_dir).replace(os.sep, "/")] = line[2:].strip()
+                    break
+    content = json.dumps(index)
+    write_text(target, content)
+    return content
+
+
+SQL_QUERY_TEMPLATES = templates(
+    r"run the query (?P<quote>[\"'`])\s*(?P<query>select\b(?:(?!(?P=quote)).)+?)\s*;?\s*(?P=quote) on "
+    r"(?:the (?:sqlite |duckdb )?database )?{source}(?:,? and write the result (?:to|into) {target})?",
+)
+SQLITE_READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION,
+                       getattr(sqlite3, "SQLITE_RECURSIVE", 33)}
+
+
+def _sqlite_rows(database: str, query: str) -> list:
+    """Runs a read-only SELECT, refusing ATTACH/PRAGMA and aborting after FAST_PATH_SQL_TIMEOUT."""
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    deadline = time.monotonic() + FAST_PATH_SQL_TIMEOUT
+    try:
+        connection.set_authorizer(
+            lambda action, *_: sqlite3.SQLITE_OK if action in SQLITE_READ_ACTIONS else sqlite3.SQLITE_DENY
+        )
+        connection.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            return connection.execute(query).fetchall()
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                raise NotHandled(f"Query exceeded {FAST_PATH_SQL_TIMEOUT}s") from e
+            raise
+    finally:
+        connection.close()
+
+
+def _duckdb_rows(database: str, query: str) -> list:
+    """Runs a read-only SELECT without access to files other than `database`, interrupted at the deadline."""
+    import duckdb
+    config = {"enable_external_access": False, "lock_configuration": True}
+    with duckdb.connect(database, read_only=True, config=config) as connection:
+        timer = threading.Timer(FAST_PATH_SQL_TIMEOUT, connection.interrupt)
+        timer.start()
+        try:
+            return connection.execute(query).fetchall()
+        except duckdb.InterruptException as e:
+            raise NotHandled(f"Query exceeded {FAST_PATH_SQL_TIMEOUT}s") from e
+        finally:
+            timer.cancel()
+
+
+@fast_path("sql_query", r"\.(db|sqlite3?|duckdb)\b", r"\bselect\b", templates=SQL_QUERY_TEMPLATES)
+def sql_query(task: str, ctx: Context) -> str:
+    match = match_template(task, SQL_QUERY_TEMPLATES)
+    database = ctx.resolve(match.group("source"))
+    if not re.search(r"\.(db|sqlite3?|duckdb)$", database):
+        raise NotHandled("Expected a database file")
+    query = match.group("query")
+    if database.endswith(".duckdb") or "duckdb" in task.lower():
+        rows = _duckdb_rows(database, query)
+    else:
+        rows = _sqlite_rows(database, query)
+    if len(rows) == 1 and len(rows[0]) == 1:
+        content = str(rows[0][0])
+    else:
+        content = json.dumps([list(row) for row in rows], default=str)
+    if match.group("target"):
+        write_text(ctx.resolve(match.group("target")), content)
+    return content
+
+
+PRETTIER_TEMPLATES = templates(
+    r"format (?:the contents of )?{source} (?:using|with) prettier(?:@(?P<version>[\w.\-]*[\w\-]))?"
+    r"(?:,? updating the file in[- ]place)?",
+)
+
+
+@fast_path("prettier", r"\bprettier\b", templates=PRETTIER_TEMPLATES)
+async def prettier(task: str, ctx: Context) -> str:
+    # Node has no in-process equivalent, but this still skips the LLM round-trip.
+    match = match_template(task, PRETTIER_TEMPLATES)
+    path = ctx.resolve(match.group("source"))
+    if not os.path.isfile(path):
+        raise NotHandled("Expected an existing file to format")
+    package = f"prettier@{match.group('version')}" if match.group("version") else "prettier"
+    result = await ctx.executor.run(["npx", "--yes", package, "--write", path])
+    if result.timed_out or result.returncode != 0:
+        raise NotHandled(f"prettier failed: {result.stderr.strip()}")
+    return result.stdout.strip()
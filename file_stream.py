@@ -0,0 +1,108 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+# Tunables (overridable through the environment)
+READ_CHUNK_SIZE = int(os.environ.get("READ_CHUNK_SIZE", str(64 * 1024)))
+READ_JSON_MAX_BYTES = int(os.environ.get("READ_JSON_MAX_BYTES", str(1024 * 1024)))
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised for a syntactically valid Range that lies outside the file."""
+
+
+def resolve_within(root: str, path: str) -> str:
+    """Resolves `path` against `root` (following symlinks); returns None if it escapes `root`."""
+    root = os.path.realpath(root)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        return None
+    return resolved
+
+
+def make_etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def validators(stat: os.stat_result) -> dict:
+    return {"ETag": make_etag(stat), "Last-Modified": formatdate(stat.st_mtime, usegmt=True)}
+
+
+def not_modified(headers, stat: os.stat_result) -> bool:
+    """Evaluates If-None-Match / If-Modified-Since against the file's current validators."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = make_etag(stat)
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(headers, stat: os.stat_result):
+    """
+    Returns `(start, end)` inclusive for a single satisfiable byte range, or None to
+    send the whole file (no Range, multiple or invalid ranges, or a stale If-Range).
+    """
+    range_header = headers.get("range")
+    if not range_header:
+        return None
+    if_range = headers.get("if-range")
+    if if_range and if_range.strip() not in (make_etag(stat), formatdate(stat.st_mtime, usegmt=True)):
+        return None
+    match = RANGE_PATTERN.match(range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    size = stat.st_size
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        # Invalid range-spec: RFC 9110 says to ignore the header, not answer 416
+        return None
+    if size == 0:
+        raise RangeNotSatisfiable()
+    if first == "":
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end
+
+
+def guess_media_type(path: str) -> str:
+    """Guesses from the extension, falling back to sniffing for binary content."""
+    media_type, _ = mimetypes.guess_type(path)
+    if media_type:
+        return f"{media_type}; charset=utf-8" if media_type.startswith("text/") else media_type
+    with open(path, "rb") as file:
+        head = file.read(1024)
+    if b"\0" in head:
+        return "application/octet-stream"
+    return "text/plain; charset=utf-8"
+
+
+def iter_file(file, start: int, length: int, chunk_size: int = READ_CHUNK_SIZE):
+    """Yields `length` bytes of an open binary file from `start`, closing it when done."""
+    try:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
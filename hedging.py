@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+LLM_HEDGE_ENABLED = os.environ.get("LLM_HEDGE_ENABLED", "1") != "0"
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", "90"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.environ.get("LLM_HEDGE_DEFAULT_DELAY", "6"))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_WINDOW = int(os.environ.get("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_BUDGET_PER_MINUTE = int(os.environ.get("LLM_HEDGE_BUDGET_PER_MINUTE", "20"))
+LLM_CANDIDATES = int(os.environ.get("LLM_CANDIDATES", "1"))
+
+
+class HedgeBudget:
+    """Sliding one-minute window capping how many extra requests may be sent."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._spent = deque()
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        while self._spent and now - self._spent[0] > 60:
+            self._spent.popleft()
+        if len(self._spent) >= self.per_minute:
+            return False
+        self._spent.append(now)
+        return True
+
+
+class HedgedGenerator:
+    """
+    Runs generation attempts with hedging to cut tail latency.
+    - Sends `candidates` attempts up front (extra ones are charged to the budget).
+    - If none is valid by the hedge deadline (a percentile of recent attempt latencies),
+      or all in-flight attempts fail, sends one more identical attempt.
+    - Returns the first attempt that completes without raising and cancels the rest.
+    """
+
+    def __init__(self, enabled: bool = LLM_HEDGE_ENABLED, percentile: float = LLM_HEDGE_PERCENTILE,
+                 default_delay: float = LLM_HEDGE_DEFAULT_DELAY, min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 budget_per_minute: int = LLM_HEDGE_BUDGET_PER_MINUTE, candidates: int = LLM_CANDIDATES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.candidates = max(1, candidates)
+        self.budget = HedgeBudget(budget_per_minute)
+        self._latencies = deque(maxlen=LLM_HEDGE_WINDOW)
+        self.stats = {"requests": 0, "extra_attempts": 0, "primary_wins": 0, "hedge_wins": 0,
+                      "budget_denied": 0, "failures": 0}
+
+    def hedge_delay(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.default_delay
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return ordered[max(index, 0)]
+
+    def _spend(self) -> bool:
+        if self.budget.try_spend():
+            self.stats["extra_attempts"] += 1
+            return True
+        self.stats["budget_denied"] += 1
+        return False
+
+    async def _timed(self, attempt):
+        # Failed and cancelled (out-hedged) attempts are recorded too, as a lower bound on
+        # their latency; dropping them would pull the deadline toward the fast mode
+        started = time.monotonic()
+        try:
+            return await attempt()
+        finally:
+            self._latencies.append(time.monotonic() - started)
+
+    async def generate(self, attempt):
+        """Awaits `attempt()` (an async factory) with hedging and returns the first valid result."""
+        self.stats["requests"] += 1
+        if not self.enabled:
+            return await self._timed(attempt)
+
+        tasks = {asyncio.create_task(self._timed(attempt)): 0}
+        for _ in range(self.candidates - 1):
+            if self._spend():
+                tasks[asyncio.create_task(self._timed(attempt))] = len(tasks)
+        hedge_sent = len(tasks) > 1
+        deadline = time.monotonic() + self.hedge_delay()
+        pending = set(tasks)
+        first_error = None
+        try:
+            while True:
+                timeout = None if hedge_sent else max(deadline - time.monotonic(), 0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        index = tasks[task]
+                        self.stats["hedge_wins" if index else "primary_wins"] += 1
+                        return task.result()
+                    first_error = first_error or task.exception()
+                    logger.warning(f"Generation attempt {tasks[task]} failed: {task.exception()}")
+                if not hedge_sent and (not pending or time.monotonic() >= deadline):
+                    # Deadline passed or every attempt failed: hedge once, if the budget allows
+                    hedge_sent = True
+                    if self._spend():
+                        logger.info("Sending hedged generation attempt")
+                        task = asyncio.create_task(self._timed(attempt))
+                        tasks[task] = len(tasks)
+                        pending.add(task)
+                if not pending:
+                    self.stats["failures"] += 1
+                    raise first_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def snapshot(self) -> dict:
+        wins = self.stats["primary_wins"] + self.stats["hedge_wins"]
+        return dict(
+            self.stats,
+            hedge_delay=round(self.hedge_delay(), 3),
+            hedge_win_rate=round(self.stats["hedge_wins"] / wins, 4) if wins else 0.0,
+        )
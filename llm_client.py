@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+import os
+import random
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+LLM_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", "30"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "16"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", "0.25"))
+LLM_BACKOFF_CAP = float(os.environ.get("LLM_BACKOFF_CAP", "4"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Raised when the LLM endpoint cannot produce a usable completion."""
+
+
+class LLMClient:
+    """
+    Async chat-completions client backed by a persistent keep-alive pool.
+    - Caps the number of in-flight requests with a semaphore.
+    - Retries transport errors and retryable statuses with full-jitter backoff.
+    """
+
+    def __init__(self, url: str, token: str, *, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, transport: httpx.AsyncBaseTransport = None):
+        self.url = url
+        self.token = token
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            ),
+            transport=transport,
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(LLM_BACKOFF_CAP, LLM_BACKOFF_BASE * (2 ** attempt)))
+
+    async def chat(self, payload: dict) -> dict:
+        """Posts a chat-completions payload and returns the decoded JSON body."""
+        return await self.post_json(payload)
+
+    async def post_json(self, payload: dict) -> dict:
+        """Posts any JSON payload to the endpoint (e.g. /embeddings) with the pool, cap and retries."""
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self._backoff(attempt)
+                logger.warning(f"Retrying LLM request in {delay:.2f}s (attempt {attempt + 1}): {last_error}")
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(self.url, json=payload)
+            except httpx.TransportError as e:
+                last_error = e
+                continue
+            if response.status_code in RETRYABLE_STATUS:
+                last_error = f"HTTP {response.status_code}"
+                continue
+            try:
+                response.raise_for_status()
+                return response.json()
+            except (httpx.HTTPStatusError, ValueError) as e:
+                raise LLMError(str(e)) from e
+        raise LLMError(f"LLM request failed after {self.max_retries + 1} attempts: {last_error}")
+
+    async def stream_chat(self, payload: dict):
+        """
+        Streams a chat completion, yielding content deltas as they arrive.
+        Connection failures are retried only until the first byte of the body is received.
+        """
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self._backoff(attempt)
+                logger.warning(f"Retrying LLM stream in {delay:.2f}s (attempt {attempt + 1}): {last_error}")
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    async with self._client.stream("POST", self.url, json={**payload, "stream": True}) as response:
+                        if response.status_code in RETRYABLE_STATUS:
+                            last_error = f"HTTP {response.status_code}"
+                            continue
+                        if response.is_error:
+                            await response.aread()
+                            raise LLMError(f"HTTP {response.status_code}: {response.text}")
+                        started = False
+                        try:
+                            async for line in response.aiter_lines():
+                                started = True
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[len("data:"):].strip()
+                                if data == "[DONE]":
+                                    return
+                                try:
+                                    choices = json.loads(data).get("choices") or [{}]
+                                except ValueError as e:
+                                    raise LLMError(f"Malformed stream chunk: {data[:200]}") from e
+                                delta = (choices[0].get("delta") or {}).get("content")
+                                if delta:
+                                    yield delta
+                            return
+                        except httpx.TransportError as e:
+                            if started:
+                                raise LLMError(f"LLM stream interrupted: {e}") from e
+                            raise
+            except httpx.TransportError as e:
+                last_error = e
+                continue
+        raise LLMError(f"LLM stream failed after {self.max_retries + 1} attempts: {last_error}")
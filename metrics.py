@@ -0,0 +1,89 @@
+"""
+Prometheus metrics, request-scoped trace IDs and per-stage timing hooks.
+
+`stage(name)` times a block into the `tds_stage_duration_seconds` histogram (labelled
+with the current endpoint), adds it to the request's timing breakdown used for the
+Server-Timing header, and counts exceptions escaping it as errors of that stage.
+"""
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+METRICS_TIMING_HEADER = os.environ.get("METRICS_TIMING_HEADER", "0") == "1"
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+REQUEST_SECONDS = Histogram(
+    "tds_request_duration_seconds", "Time to produce a response (headers) per endpoint",
+    ["endpoint", "status"], buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "tds_stage_duration_seconds", "Time spent in each pipeline stage",
+    ["endpoint", "stage"], buckets=LATENCY_BUCKETS,
+)
+STAGE_ERRORS = Counter("tds_stage_errors_total", "Errors raised per pipeline stage", ["stage"])
+LLM_TOKENS = Counter("tds_llm_tokens_total", "LLM tokens reported by the proxy", ["kind"])
+EXEC_EXIT_CODES = Counter("tds_exec_exit_codes_total", "Generated script exit codes", ["code"])
+
+trace_id_var = ContextVar("trace_id", default="-")
+endpoint_var = ContextVar("endpoint", default="other")
+timings_var = ContextVar("timings", default=None)
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds the current request's trace ID to every log record as `trace_id`."""
+
+    def filter(self, record):
+        record.trace_id = trace_id_var.get()
+        return True
+
+
+def observe_stage(name: str, seconds: float):
+    STAGE_SECONDS.labels(endpoint_var.get(), name).observe(seconds)
+    timings = timings_var.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        if isinstance(e, Exception):
+            STAGE_ERRORS.labels(name).inc()
+        raise
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def record_usage(response_json: dict):
+    """Counts the token usage block of a chat-completions response, if present."""
+    usage = response_json.get("usage") or {}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.labels(kind.removesuffix("_tokens")).inc(usage[kind])
+
+
+def start_request(endpoint: str, trace_id: str = None) -> dict:
+    """Binds a trace ID, endpoint label and fresh timing dict to the current context."""
+    trace_id_var.set(trace_id or uuid.uuid4().hex)
+    endpoint_var.set(endpoint)
+    timings = {}
+    timings_var.set(timings)
+    return timings
+
+
+def server_timing(timings: dict) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+def render() -> tuple:
+    """Returns `(body, content_type)` for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
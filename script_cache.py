@@ -0,0 +1,96 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+SCRIPT_CACHE_PATH = os.environ.get("SCRIPT_CACHE_PATH", "/var/cache/tds/scripts.sqlite3")
+SCRIPT_CACHE_MAX_ENTRIES = int(os.environ.get("SCRIPT_CACHE_MAX_ENTRIES", "2000"))
+SCRIPT_CACHE_MAX_BYTES = int(os.environ.get("SCRIPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def normalize_task(task: str) -> str:
+    """Collapses whitespace so trivially different spellings of a task share a key."""
+    return re.sub(r"\s+", " ", task).strip()
+
+
+def cache_key(task: str, system_prompt: str, model: str) -> str:
+    prompt_hash = hashlib.sha256(system_prompt.encode()).hexdigest()
+    material = "\0".join([normalize_task(task), prompt_hash, model])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class ScriptCache:
+    """
+    On-disk LRU cache of validated `{code, language, exec}` LLM responses.
+    - Entries are evicted least-recently-used first once either the entry or byte budget is exceeded.
+    - Calls are synchronous and short; run them via asyncio.to_thread from request handlers.
+    """
+
+    def __init__(self, path: str = SCRIPT_CACHE_PATH, max_entries: int = SCRIPT_CACHE_MAX_ENTRIES,
+                 max_bytes: int = SCRIPT_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS scripts ("
+            " key TEXT PRIMARY KEY, task TEXT NOT NULL, payload TEXT NOT NULL,"
+            " size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS scripts_last_used ON scripts (last_used)")
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute("SELECT payload FROM scripts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._db.execute("UPDATE scripts SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.stats["hits"] += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, task: str, script: dict):
+        payload = json.dumps(script)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO scripts (key, task, payload, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, normalize_task(task), payload, len(payload), time.time()),
+            )
+            self.stats["stores"] += 1
+            self._evict()
+
+    def invalidate(self, key: str):
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM scripts WHERE key = ?", (key,)).rowcount
+            self.stats["invalidations"] += deleted
+        if deleted:
+            logger.info(f"Invalidated cached script {key[:12]}")
+
+    def _evict(self):
+        count, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scripts").fetchone()
+        while count > self.max_entries or total > self.max_bytes:
+            row = self._db.execute("SELECT key, size FROM scripts ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM scripts WHERE key = ?", (row[0],))
+            self.stats["evictions"] += 1
+            count, total = count - 1, total - row[1]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM scripts").fetchone()
+            return dict(self.stats, entries=entries, bytes=size)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
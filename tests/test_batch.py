@@ -0,0 +1,78 @@
+import pytest
+
+from batch import dedupe, plan_dependencies, task_io
+
+# Phrasings of the task families in SYSTEM_PROMPT
+IO_CASES = [
+    ("Format the contents of /data/format.md using prettier@3.4.2, updating the file in-place",
+     {"/data/format.md"}, {"/data/format.md"}),
+    ("The file /data/dates.txt contains a list of dates, one per line. Count the number of Wednesdays in the "
+     "list, and write just the number to /data/dates-wednesdays.txt",
+     {"/data/dates.txt"}, {"/data/dates-wednesdays.txt"}),
+    ("Write the # of Wednesdays in /data/dates.txt into /data/dates-wednesdays.txt",
+     {"/data/dates.txt"}, {"/data/dates-wednesdays.txt"}),
+    ("Sort the array of contacts in /data/contacts.json by last_name, then first_name, and write the result "
+     "to /data/contacts-sorted.json",
+     {"/data/contacts.json"}, {"/data/contacts-sorted.json"}),
+    ("Write the first line of the 10 most recent .log file in /data/logs/ to /data/logs-recent.txt, "
+     "most recent first",
+     {"/data/logs"}, {"/data/logs-recent.txt"}),
+    ("Find all Markdown (.md) files in /data/docs/. For each file, extract the first occurrence of each H1. "
+     "Create an index file /data/docs/index.json that maps each filename to its title",
+     {"/data/docs"}, {"/data/docs/index.json"}),
+    ("/data/email.txt contains an email message. Pass the content to an LLM with instructions to extract the "
+     "sender's email address, and write just the email address to /data/email-sender.txt",
+     {"/data/email.txt"}, {"/data/email-sender.txt"}),
+    ("/data/credit-card.png contains a credit card number. Pass the image to an LLM, have it extract the card "
+     "number, and write it without spaces to /data/credit-card.txt",
+     {"/data/credit-card.png"}, {"/data/credit-card.txt"}),
+    ("/data/comments.txt contains a list of comments, one per line. Using embeddings, find the most similar "
+     "pair of comments and write them to /data/comments-similar.txt, one per line",
+     {"/data/comments.txt"}, {"/data/comments-similar.txt"}),
+    ("The SQLite database file /data/ticket-sales.db has a tickets with columns type, units, and price. What is "
+     "the total sales of all the items in the Gold ticket type? Write the number in /data/ticket-sales-gold.txt",
+     {"/data/ticket-sales.db"}, {"/data/ticket-sales-gold.txt"}),
+]
+
+
+@pytest.mark.parametrize("task,inputs,outputs", IO_CASES)
+def test_task_io(task, inputs, outputs):
+    assert task_io(task) == (inputs, outputs)
+
+
+def test_readers_of_the_same_input_are_independent():
+    tasks = [
+        "Write the # of Wednesdays in /data/dates.txt into /data/dates-wednesdays.txt",
+        "Write the # of Fridays in /data/dates.txt into /data/dates-fridays.txt",
+        "Count the number of Sundays in /data/dates.txt and write the number to /data/dates-sundays.txt",
+    ]
+    assert plan_dependencies(tasks) == [set(), set(), set()]
+
+
+def test_system_prompt_tasks_only_depend_on_shared_outputs():
+    dependencies = plan_dependencies([task for task, _, _ in IO_CASES])
+    # Both phrasings of the Wednesdays task write /data/dates-wednesdays.txt
+    assert dependencies[2] == {1}
+    assert all(deps == set() for index, deps in enumerate(dependencies) if index != 2)
+
+
+def test_consumer_waits_for_producer():
+    tasks = [
+        "Count the lines in /data/summary.txt and write the number to /data/summary-lines.txt",
+        "Sort the array of contacts in /data/contacts.json by last_name and write the result to /data/summary.txt",
+    ]
+    assert plan_dependencies(tasks) == [{1}, set()]
+
+
+def test_writers_of_the_same_file_keep_submission_order():
+    tasks = [
+        "Write the # of Mondays in /data/dates.txt into /data/out.txt",
+        "Write the # of Fridays in /data/dates.txt into /data/out.txt",
+    ]
+    assert plan_dependencies(tasks) == [set(), {0}]
+
+
+def test_dedupe_collapses_whitespace():
+    unique, index_map = dedupe(["a  task", "b", "a task"])
+    assert unique == ["a  task", "b"]
+    assert index_map == [0, 1, 0]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+import deps
+from deps import EnvironmentCache, imported_modules, missing_requirements, script_dependencies
+
+INLINE_METADATA = """\
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#   "requests<3",
+#   "Rich",
+# ]
+# ///
+import requests
+"""
+
+
+def test_script_dependencies():
+    assert script_dependencies(INLINE_METADATA) == ["requests<3", "Rich"]
+    assert script_dependencies("import os\n") == []
+    assert script_dependencies("# /// script\n# dependencies = [\n# ///\n") == []
+
+
+def test_imported_modules():
+    code = "import os.path, json\nfrom PIL import Image\nfrom . import sibling\nimport xml.etree.ElementTree as ET\n"
+    assert imported_modules(code) == {"os", "json", "PIL", "xml"}
+    assert imported_modules("def broken(:\n") == set()
+
+
+def test_missing_requirements_maps_imports_to_distributions():
+    code = "import os\nimport numpy\nimport yaml_missing_xyz\nfrom sklearn import svm\nimport cv2\n"
+    missing = missing_requirements(code)
+    assert "numpy" not in missing and "os" not in missing
+    assert deps.IMPORT_TO_DIST["sklearn"] == "scikit-learn"
+    assert {"scikit-learn", "opencv-python-headless", "yaml-missing-xyz"} <= set(missing)
+
+
+def test_missing_requirements_checks_declared_versions():
+    code = '# /// script\n# dependencies = ["numpy<1", "Definitely_Missing==2.0"]\n# ///\nimport definitely_missing\n'
+    # Declared requirements keep their specifier and cover the matching import
+    assert missing_requirements(code) == ("definitely-missing==2.0", "numpy<1")
+    assert missing_requirements('# /// script\n# dependencies = ["numpy>=1"]\n# ///\nimport numpy\n') == ()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = EnvironmentCache(root=str(tmp_path / "venvs"), wheelhouse=str(tmp_path / "wheels"))
+    release = asyncio.Event()
+
+    async def install(key, requirements):
+        await release.wait()
+        cache._envs[key] = frozenset(requirements)
+        return True
+
+    monkeypatch.setattr(cache, "_install", install)
+    cache.release = release
+    return cache
+
+
+def test_interpreter_for_uses_base_until_the_env_is_built(cache):
+    code = "import definitely_missing_pkg\n"
+
+    async def scenario():
+        assert await cache.interpreter_for("import os\n") is None
+        assert await cache.interpreter_for(code, wait=0.05) is None
+        assert cache.snapshot()["building"] == 1
+        cache.release.set()
+        assert (await cache.interpreter_for(code, wait=1)).endswith("/bin/python")
+        # Later scripts with the same requirements reuse the env without waiting
+        assert await cache.interpreter_for(code + "import os\n", wait=0) is not None
+
+    asyncio.run(scenario())
+    assert cache.stats["build_pending"] == 1
+    assert cache.snapshot()["building"] == 0
+
+
+def test_failed_builds_fall_back_to_base(cache, monkeypatch):
+    async def install(key, requirements):
+        raise OSError("no venv module")
+
+    monkeypatch.setattr(cache, "_install", install)
+    assert asyncio.run(cache.interpreter_for("import definitely_missing_pkg\n")) is None
+    assert cache.stats["build_failures"] == 1
+    assert asyncio.run(cache.interpreter_for("import definitely_missing_pkg\n")) is None
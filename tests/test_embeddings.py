@@ -0,0 +1,92 @@
+import asyncio
+import itertools
+
+import numpy as np
+import pytest
+
+from embeddings import EmbeddingService, HashingEmbeddingBackend, VectorStore, normalize_rows
+
+COMMENTS = [
+    "The delivery arrived late and the box was damaged",
+    "Great prices and friendly support",
+    "My order arrived late and the packaging was damaged",
+    "The app crashed while I was paying",
+    "Support never answered my emails",
+]
+
+
+@pytest.fixture
+def service(tmp_path):
+    return EmbeddingService(HashingEmbeddingBackend(dim=256), cache_dir=str(tmp_path), batch_size=2)
+
+
+def brute_force_pair(vectors):
+    vectors = normalize_rows(vectors)
+    return max(itertools.combinations(range(len(vectors)), 2), key=lambda pair: vectors[pair[0]] @ vectors[pair[1]])
+
+
+def test_embed_batches_and_caches(service):
+    vectors = asyncio.run(service.embed(COMMENTS))
+    assert vectors.shape == (5, 256)
+    assert service.stats["upstream_requests"] == 3
+    again = asyncio.run(service.embed(COMMENTS[::-1]))
+    np.testing.assert_array_equal(again, vectors[::-1])
+    assert service.stats["upstream_requests"] == 3
+    assert service.stats["cache_hits"] == 5
+
+
+def test_most_similar_pair(service):
+    i, j, score = asyncio.run(service.most_similar_pair(COMMENTS))
+    assert (i, j) == (0, 2)
+    assert 0 < score <= 1
+
+
+def test_most_similar_pair_matches_brute_force_across_blocks(service, monkeypatch):
+    monkeypatch.setattr("embeddings.EMBEDDINGS_BLOCK_ROWS", 3)
+    rng = np.random.default_rng(0)
+    texts = [" ".join(f"w{n}" for n in rng.integers(0, 40, size=6)) for _ in range(25)]
+    i, j, _ = asyncio.run(service.most_similar_pair(texts))
+    vectors = asyncio.run(service.embed(texts))
+    best = brute_force_pair(vectors)
+    scores = normalize_rows(vectors)
+    assert scores[i] @ scores[j] == pytest.approx(scores[best[0]] @ scores[best[1]])
+    assert i < j
+
+
+def test_most_similar_pair_needs_two_texts(service):
+    with pytest.raises(ValueError):
+        asyncio.run(service.most_similar_pair(["only one"]))
+
+
+def test_top_k(service):
+    results = asyncio.run(service.top_k("arrived late and damaged", COMMENTS, k=2))
+    assert {index for index, _ in results} == {0, 2}
+    assert results[0][1] >= results[1][1]
+    assert len(asyncio.run(service.top_k("late", COMMENTS, k=50))) == len(COMMENTS)
+    assert asyncio.run(service.top_k("late", [], k=3)) == []
+
+
+@pytest.mark.parametrize("k", [0, -2])
+def test_top_k_rejects_non_positive_k(service, k):
+    with pytest.raises(ValueError):
+        asyncio.run(service.top_k("late", COMMENTS, k=k))
+
+
+def test_cache_is_reopened_from_disk(tmp_path):
+    first = EmbeddingService(HashingEmbeddingBackend(dim=64), cache_dir=str(tmp_path))
+    vectors = asyncio.run(first.embed(COMMENTS))
+    reopened = EmbeddingService(HashingEmbeddingBackend(dim=64), cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(asyncio.run(reopened.embed(COMMENTS)), vectors)
+    assert reopened.stats["upstream_requests"] == 0
+    assert reopened.snapshot()["cached_vectors"] == len(COMMENTS)
+
+
+def test_vector_store_grows_and_reopens(tmp_path):
+    store = VectorStore(str(tmp_path), dim=4, initial_capacity=2)
+    vectors = np.arange(20, dtype=np.float32).reshape(5, 4)
+    store.add(["a", "b", "c"], vectors[:3])
+    store.add(["d", "e"], vectors[3:])
+    reopened = VectorStore(str(tmp_path), dim=4)
+    assert len(reopened) == 5
+    assert "c" in reopened and "z" not in reopened
+    np.testing.assert_array_equal(reopened.get(["e", "a"]), vectors[[4, 0]])
@@ -0,0 +1,52 @@
+import asyncio
+import sys
+
+import pytest
+
+import executor
+from executor import ExecutorSaturated, ScriptExecutor, limited_argv
+
+READ_LIMIT = "import resource; print(resource.getrlimit(resource.RLIMIT_DATA)[0])"
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.mark.parametrize("prlimit", [executor.PRLIMIT, None])
+def test_memory_limit_is_applied(monkeypatch, prlimit):
+    monkeypatch.setattr(executor, "PRLIMIT", prlimit)
+    result = run(ScriptExecutor(memory_limit_mb=512).run([sys.executable, "-c", READ_LIMIT]))
+    assert result.returncode == 0
+    assert int(result.stdout) == 512 * 1024 * 1024
+
+
+def test_no_limit_leaves_argv_alone():
+    assert limited_argv(["python3", "x.py"], 0) == ["python3", "x.py"]
+
+
+def test_output_and_exit_code():
+    lines = []
+    script = "import sys; print('a'); print('b'); print('oops', file=sys.stderr); sys.exit(3)"
+    result = run(ScriptExecutor().run([sys.executable, "-c", script],
+                                      on_output=lambda stream, line: lines.append((stream, line))))
+    assert (result.returncode, result.stdout, result.stderr) == (3, "a\nb\n", "oops\n")
+    assert sorted(lines) == [("stderr", "oops"), ("stdout", "a"), ("stdout", "b")]
+
+
+def test_timeout_kills_the_script():
+    result = run(ScriptExecutor(timeout=0.5).run([sys.executable, "-c", "import time; time.sleep(30)"]))
+    assert result.timed_out
+    assert result.duration < 5
+
+
+def test_saturated_executor_rejects():
+    async def main():
+        pool = ScriptExecutor(max_workers=1, max_queue=0)
+        first = asyncio.create_task(pool.run([sys.executable, "-c", "import time; time.sleep(0.5)"]))
+        await asyncio.sleep(0.1)
+        with pytest.raises(ExecutorSaturated):
+            await pool.run([sys.executable, "-c", "pass"])
+        assert (await first).returncode == 0
+
+    run(main())
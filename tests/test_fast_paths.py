@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import sqlite3
+
+import pytest
+
+import fast_paths
+
+DATES = ["2024-01-03", "2024/01/10 10:00:00", "17-Jan-2024", "Jan 24, 2024", "2024-01-05"]
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "dates.txt").write_text("\n".join(DATES) + "\n")
+    (tmp_path / "contacts.json").write_text(json.dumps([
+        {"first_name": "Bob", "last_name": "Smith"},
+        {"first_name": "Alice", "last_name": "Smith"},
+        {"first_name": "Carol", "last_name": "Jones"},
+    ]))
+    (tmp_path / "email.txt").write_text('From: "Donna Jackson" <donna@example.net>\nTo: a@example.com\n\nHi\n')
+    return tmp_path
+
+
+def dispatch(task, data_dir):
+    return asyncio.run(fast_paths.dispatch(task, str(data_dir), None))
+
+
+@pytest.mark.parametrize("task", [
+    "Write the # of Wednesdays in /data/dates.txt into /data/out.txt",
+    "Count the # of Wednesdays in /data/dates.txt and write the number to /data/out.txt",
+    "The file /data/dates.txt contains a list of dates, one per line. Count the number of Wednesdays "
+    "in the list, and write just the number to /data/out.txt",
+    "How many Wednesdays are in /data/dates.txt? Write the count to /data/out.txt",
+])
+def test_count_weekdays_phrasings(task, data_dir):
+    assert dispatch(task, data_dir) == ("count_weekdays", "4")
+    assert (data_dir / "out.txt").read_text() == "4"
+
+
+@pytest.mark.parametrize("task", [
+    "How many Wednesdays in /data/dates.txt fall in 2024? Write the count to /data/out.txt",
+    "Count the number of Fridays in /data/dates.txt that are in December and write the number to /data/out.txt",
+    "Count the number of Wednesdays and Fridays in /data/dates.txt and write the number to /data/out.txt",
+])
+def test_count_weekdays_declines_qualified_tasks(task, data_dir):
+    assert dispatch(task, data_dir) is None
+    assert not (data_dir / "out.txt").exists()
+
+
+def test_sort_contacts(data_dir):
+    task = ("Sort the array of contacts in /data/contacts.json by last_name, then first_name, "
+            "and write the result to /data/sorted.json")
+    assert dispatch(task, data_dir)[0] == "sort_contacts"
+    names = [contact["first_name"] for contact in json.loads((data_dir / "sorted.json").read_text())]
+    assert names == ["Carol", "Alice", "Bob"]
+
+
+@pytest.mark.parametrize("task", [
+    "Sort the contacts in /data/contacts.json by last_name descending and write the result to /data/sorted.json",
+    "Sort the array of contacts in /data/contacts.json by last_name, then first_name, in reverse order, "
+    "and write the result to /data/sorted.json",
+])
+def test_sort_contacts_declines_qualified_tasks(task, data_dir):
+    assert dispatch(task, data_dir) is None
+
+
+def test_sender_email(data_dir):
+    task = ("/data/email.txt contains an email message. Pass the content to an LLM with instructions to extract "
+            "the sender’s email address, and write just the email address to /data/sender.txt")
+    assert dispatch(task, data_dir) == ("sender_email", "donna@example.net")
+
+
+def test_sender_email_declines_other_fields(data_dir):
+    task = ("/data/email.txt contains an email message. Extract the sender's email address and the subject, "
+            "and write just the email address to /data/sender.txt")
+    assert dispatch(task, data_dir) is None
+
+
+@pytest.fixture
+def logs_dir(data_dir):
+    logs = data_dir / "logs"
+    logs.mkdir()
+    for index in range(3):
+        path = logs / f"log-{index}.log"
+        path.write_text(f"line {index}\nmore\n")
+        os.utime(path, (1000 + index, 1000 + index))
+    return logs
+
+
+def test_recent_logs(logs_dir, data_dir):
+    task = "Write the first line of the 2 most recent .log files in /data/logs/ to /data/recent.txt, most recent first"
+    assert dispatch(task, data_dir) == ("recent_logs", "line 2\nline 1")
+
+
+@pytest.mark.parametrize("task", [
+    "Write the first line of the 2 most recent .log files in /data/logs/ to /data/recent.txt, oldest first",
+    "Write the first line of the 2 most recent .log files in /data/logs/ that contain ERROR to /data/recent.txt",
+])
+def test_recent_logs_declines_qualified_tasks(task, logs_dir, data_dir):
+    assert dispatch(task, data_dir) is None
+    assert not (data_dir / "recent.txt").exists()
+
+
+@pytest.fixture
+def docs_dir(data_dir):
+    docs = data_dir / "docs"
+    (docs / "a").mkdir(parents=True)
+    (docs / "a" / "README.md").write_text("Intro\n\n# Alpha\n\n## Details\n")
+    (docs / "b.md").write_text("## Sub\n# Beta\n")
+    return docs
+
+
+def test_markdown_index(docs_dir, data_dir):
+    task = ("Find all Markdown (.md) files in /data/docs/. For each file, extract the first occurrence of each "
+            "H1 title. Create an index file /data/docs/index.json that maps each filename to its title")
+    assert dispatch(task, data_dir)[0] == "markdown_index"
+    assert json.loads((docs_dir / "index.json").read_text()) == {"a/README.md": "Alpha", "b.md": "Beta"}
+
+
+def test_markdown_index_declines_qualified_tasks(docs_dir, data_dir):
+    task = ("Find all Markdown (.md) files in /data/docs/. For each file, extract the first H2 title. "
+            "Create an index file /data/docs/idx.json that maps each filename to its title")
+    assert dispatch(task, data_dir) is None
+    assert not (docs_dir / "idx.json").exists()
+
+
+@pytest.fixture
+def database(data_dir):
+    connection = sqlite3.connect(data_dir / "tickets.db")
+    with connection:
+        connection.execute("CREATE TABLE tickets (type TEXT, units INTEGER, price REAL)")
+        connection.executemany("INSERT INTO tickets VALUES (?, ?, ?)", [("Gold", 2, 10.0), ("Silver", 3, 5.0)])
+    connection.close()
+    return data_dir / "tickets.db"
+
+
+def test_sql_query(database, data_dir):
+    task = ("Run the query \"SELECT SUM(units * price) FROM tickets WHERE type = 'Silver'\" on /data/tickets.db "
+            "and write the result to /data/silver.txt")
+    assert dispatch(task, data_dir) == ("sql_query", "15.0")
+    assert (data_dir / "silver.txt").read_text() == "15.0"
+
+
+@pytest.mark.parametrize("task", [
+    "Run the query \"SELECT type FROM tickets\" on /data/tickets.db and write the result as CSV to /data/out.csv",
+    "Run the query \"SELECT type FROM tickets\" on /data/tickets.db, sorted by type, "
+    "and write the result to /data/out.txt",
+])
+def test_sql_query_declines_qualified_tasks(task, database, data_dir):
+    assert dispatch(task, data_dir) is None
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT * FROM pragma_table_info('tickets') WHERE 0",
+    "SELECT load_extension('x')",
+])
+def test_sql_query_refuses_pragmas_and_extensions(query, database, data_dir):
+    assert dispatch(f"Run the query \"{query}\" on /data/tickets.db", data_dir) is None
+
+
+def test_sql_query_deadline(database, data_dir, monkeypatch):
+    monkeypatch.setattr(fast_paths, "FAST_PATH_SQL_TIMEOUT", 0.2)
+    query = ("SELECT COUNT(*) FROM (WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) "
+             "SELECT i FROM n)")
+    assert dispatch(f"Run the query \"{query}\" on /data/tickets.db", data_dir) is None
+
+
+def test_prettier_declines_qualified_tasks(data_dir):
+    (data_dir / "format.md").write_text("#  Title\n")
+    task = "Format the contents of /data/format.md using prettier@3.4.2, with a print width of 40"
+    assert dispatch(task, data_dir) is None
+
+
+@pytest.mark.parametrize("task, expected", [
+    ("How many Wednesdays are in /data/dates.txt? Write the count to /data/out.txt", True),
+    ("How many Wednesdays in /data/dates.txt fall in 2024? Write the count to /data/out.txt", False),
+    ("Write the first line of the 2 most recent .log files in /data/logs/ to /data/recent.txt, oldest first", False),
+    ("Run the query \"SELECT type FROM tickets\" on /data/tickets.db and write the result as CSV to /data/out.csv",
+     False),
+])
+def test_might_handle_applies_templates(task, expected):
+    assert fast_paths.might_handle(task) is expected
@@ -0,0 +1,73 @@
+import os
+from email.utils import formatdate
+
+import pytest
+
+from file_stream import RangeNotSatisfiable, make_etag, not_modified, parse_range
+
+
+@pytest.fixture
+def stat(tmp_path):
+    path = tmp_path / "file.bin"
+    path.write_bytes(bytes(range(100)))
+    return os.stat(path)
+
+
+@pytest.fixture
+def empty_stat(tmp_path):
+    path = tmp_path / "empty.bin"
+    path.write_bytes(b"")
+    return os.stat(path)
+
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=95-500", (95, 99)),
+])
+def test_parse_range(stat, header, expected):
+    assert parse_range({"range": header}, stat) == expected
+
+
+@pytest.mark.parametrize("header", [None, "bytes=-", "bytes=0-1,5-6", "items=0-5", "bytes=5-2"])
+def test_parse_range_ignores_absent_or_invalid_ranges(stat, header):
+    assert parse_range({"range": header} if header else {}, stat) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=200-300", "bytes=-0"])
+def test_parse_range_unsatisfiable(stat, header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range({"range": header}, stat)
+
+
+@pytest.mark.parametrize("header", ["bytes=-5", "bytes=0-", "bytes=0-10"])
+def test_parse_range_empty_file_is_unsatisfiable(empty_stat, header):
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range({"range": header}, empty_stat)
+
+
+def test_parse_range_honours_if_range(stat):
+    assert parse_range({"range": "bytes=0-9", "if-range": make_etag(stat)}, stat) == (0, 9)
+    assert parse_range({"range": "bytes=0-9", "if-range": '"stale"'}, stat) is None
+
+
+def test_not_modified_etag(stat):
+    etag = make_etag(stat)
+    assert not_modified({"if-none-match": etag}, stat)
+    assert not_modified({"if-none-match": f'"other", W/{etag}'}, stat)
+    assert not_modified({"if-none-match": "*"}, stat)
+    assert not not_modified({"if-none-match": '"other"'}, stat)
+
+
+def test_not_modified_etag_takes_precedence_over_date(stat):
+    headers = {"if-none-match": '"other"', "if-modified-since": formatdate(stat.st_mtime + 60, usegmt=True)}
+    assert not not_modified(headers, stat)
+
+
+def test_not_modified_since(stat):
+    assert not_modified({"if-modified-since": formatdate(stat.st_mtime, usegmt=True)}, stat)
+    assert not not_modified({"if-modified-since": formatdate(stat.st_mtime - 60, usegmt=True)}, stat)
+    assert not not_modified({"if-modified-since": "not a date"}, stat)
+    assert not not_modified({}, stat)
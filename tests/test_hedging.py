@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from hedging import HedgedGenerator
+
+
+def generator(**kwargs):
+    options = dict(enabled=True, percentile=90, default_delay=0.05, min_samples=20, budget_per_minute=10_000,
+                   candidates=1)
+    return HedgedGenerator(**{**options, **kwargs})
+
+
+def test_hedged_out_attempts_are_recorded():
+    # Dropping cancelled slow attempts would bias the percentile deadline toward the fast mode
+    calls = []
+
+    async def attempt():
+        calls.append(None)
+        await asyncio.sleep(1 if len(calls) == 1 else 0.001)
+        return len(calls)
+
+    async def main():
+        hedger = generator(default_delay=0.02)
+        await hedger.generate(attempt)
+        await asyncio.sleep(0)  # let the cancelled primary unwind
+        return hedger
+
+    hedger = asyncio.run(main())
+    assert len(hedger._latencies) == 2
+    assert max(hedger._latencies) >= 0.02
+
+
+def test_hedge_wins_when_primary_is_slow():
+    calls = []
+
+    async def attempt():
+        calls.append(None)
+        await asyncio.sleep(1 if len(calls) == 1 else 0.001)
+        return len(calls)
+
+    hedger = generator(default_delay=0.01)
+    assert asyncio.run(hedger.generate(attempt)) == 2
+    assert hedger.stats["hedge_wins"] == 1
+
+
+def test_raises_when_every_attempt_fails():
+    async def attempt():
+        raise ValueError("bad completion")
+
+    hedger = generator(default_delay=0.01)
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.generate(attempt))
+    assert hedger.stats["failures"] == 1
+    assert len(hedger._latencies) == 2
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+import llm_client  # noqa: E402
+from llm_client import LLMClient, LLMError  # noqa: E402
+
+URL = "http://llm.test/v1/chat/completions"
+COMPLETION = {"choices": [{"message": {"content": "hi"}}]}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_BACKOFF_BASE", 0)
+
+
+def client_for(*responses, max_retries=2):
+    """A client whose transport replays `responses` (Responses, or exceptions to raise) in order."""
+    requests = []
+    queue = list(responses)
+
+    def handler(request):
+        requests.append(request)
+        response = queue.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    client = LLMClient(URL, "token", max_retries=max_retries, transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+def run(coroutine_function):
+    return asyncio.run(coroutine_function())
+
+
+def test_chat_retries_retryable_statuses_and_transport_errors():
+    client, requests = client_for(httpx.Response(503), httpx.ConnectError("refused"),
+                                  httpx.Response(200, json=COMPLETION))
+    assert run(lambda: client.chat({"model": "m"})) == COMPLETION
+    assert len(requests) == 3
+    assert requests[0].headers["Authorization"] == "Bearer token"
+
+
+def test_chat_gives_up_after_max_retries():
+    client, requests = client_for(*(httpx.Response(429) for _ in range(3)))
+    with pytest.raises(LLMError, match="after 3 attempts: HTTP 429"):
+        run(lambda: client.chat({}))
+    assert len(requests) == 3
+
+
+@pytest.mark.parametrize("response", [httpx.Response(400, json={"error": "bad"}), httpx.Response(200, text="<html>")])
+def test_chat_does_not_retry_client_errors_or_bad_bodies(response):
+    client, requests = client_for(response, httpx.Response(200, json=COMPLETION))
+    with pytest.raises(LLMError):
+        run(lambda: client.chat({}))
+    assert len(requests) == 1
+
+
+def test_post_json_sends_the_payload_unchanged():
+    client, requests = client_for(httpx.Response(200, json={"data": []}))
+    assert run(lambda: client.post_json({"model": "e", "input": ["a"]})) == {"data": []}
+    assert json.loads(requests[0].content) == {"model": "e", "input": ["a"]}
+
+
+def sse(*events):
+    return "".join(f"data: {event}\n\n" for event in events)
+
+
+def chunk(content):
+    return json.dumps({"choices": [{"delta": {"content": content}}]})
+
+
+async def collect(client):
+    return [delta async for delta in client.stream_chat({"model": "m"})]
+
+
+def test_stream_yields_deltas_until_done():
+    body = ": keep-alive\n\n" + sse(chunk("Hel"), json.dumps({"choices": []}), chunk("lo"), "[DONE]", chunk("late"))
+    client, requests = client_for(httpx.Response(503), httpx.Response(200, text=body))
+    assert run(lambda: collect(client)) == ["Hel", "lo"]
+    assert len(requests) == 2
+    assert json.loads(requests[1].content)["stream"] is True
+
+
+def test_stream_rejects_malformed_chunks():
+    client, _ = client_for(httpx.Response(200, text=sse(chunk("ok"), "{not json")))
+    with pytest.raises(LLMError, match="Malformed stream chunk"):
+        run(lambda: collect(client))
+
+
+def test_stream_is_not_retried_after_the_first_byte():
+    async def body():
+        yield sse(chunk("partial")).encode()
+        raise httpx.ReadError("connection reset")
+
+    client, requests = client_for(httpx.Response(200, content=body()), httpx.Response(200, text=sse("[DONE]")))
+    with pytest.raises(LLMError, match="interrupted"):
+        run(lambda: collect(client))
+    assert len(requests) == 1
+
+
+def test_stream_reports_non_retryable_errors():
+    client, requests = client_for(httpx.Response(401, text="no key"))
+    with pytest.raises(LLMError, match="HTTP 401: no key"):
+        run(lambda: collect(client))
+    assert len(requests) == 1
@@ -0,0 +1,81 @@
+import itertools
+import json
+import types
+
+import pytest
+
+import script_cache
+from script_cache import ScriptCache, cache_key
+
+SCRIPT = {"code": "print('ok')\n", "language": "python", "exec": "python3 code_generated.py"}
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    # Strictly increasing timestamps, so recency never ties
+    ticks = itertools.count(1)
+    monkeypatch.setattr(script_cache, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ScriptCache(str(tmp_path / "scripts.sqlite3"), max_entries=3)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_ignores_whitespace_but_not_prompt_or_model():
+    key = cache_key("Count  the\nlines", "prompt", "gpt-4o-mini")
+    assert key == cache_key(" Count the lines ", "prompt", "gpt-4o-mini")
+    assert key != cache_key("Count the lines", "other prompt", "gpt-4o-mini")
+    assert key != cache_key("Count the lines", "prompt", "gpt-4o")
+
+
+def test_get_counts_hits_and_misses(cache):
+    assert cache.get("a") is None
+    cache.put("a", "task a", SCRIPT)
+    assert cache.get("a") == SCRIPT
+    assert cache.snapshot() == {"hits": 1, "misses": 1, "stores": 1, "evictions": 0, "invalidations": 0,
+                                "entries": 1, "bytes": len(json.dumps(SCRIPT))}
+
+
+def test_entry_budget_evicts_least_recently_used(cache):
+    for key in "abc":
+        cache.put(key, f"task {key}", SCRIPT)
+    assert cache.get("a") == SCRIPT  # refreshes "a", so "b" is now the oldest
+    cache.put("d", "task d", SCRIPT)
+    assert cache.get("b") is None
+    assert all(cache.get(key) == SCRIPT for key in "acd")
+    assert cache.snapshot()["evictions"] == 1
+    assert cache.snapshot()["entries"] == 3
+
+
+def test_byte_budget_evicts_until_it_fits(tmp_path):
+    size = len(json.dumps(SCRIPT))
+    cache = ScriptCache(str(tmp_path / "scripts.sqlite3"), max_bytes=2 * size)
+    for key in "abc":
+        cache.put(key, f"task {key}", SCRIPT)
+    assert cache.get("a") is None
+    assert cache.snapshot()["bytes"] == 2 * size
+    large = dict(SCRIPT, code="x" * 3 * size)
+    cache.put("large", "task large", large)
+    assert cache.snapshot()["entries"] == 0
+    cache.close()
+
+
+def test_invalidate(cache):
+    cache.put("a", "task a", SCRIPT)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
+    assert cache.snapshot()["invalidations"] == 1
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "scripts.sqlite3")
+    cache = ScriptCache(path)
+    cache.put("a", "task a", SCRIPT)
+    cache.close()
+    reopened = ScriptCache(path)
+    assert reopened.get("a") == SCRIPT
+    reopened.close()
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+import pytest
+
+from executor import ScriptExecutor
+from warm_pool import WarmPool
+
+
+@pytest.fixture(autouse=True)
+def cheap_warm_modules(monkeypatch):
+    # Zygotes read WARM_MODULES from the environment they inherit
+    monkeypatch.setenv("WARM_MODULES", "json")
+    monkeypatch.setenv("WARM_EASYOCR_LANGS", "")
+
+
+def test_run_warm_fast_script(tmp_path):
+    script = tmp_path / "fast.py"
+    script.write_text("import sys\nprint('hello')\nprint('oops', file=sys.stderr)\nsys.exit(2)\n")
+
+    async def scenario():
+        pool = WarmPool(size=1)
+        await pool.start()
+        try:
+            assert pool.supports("python")
+            executor = ScriptExecutor(timeout=10)
+            # Fast scripts can finish before the pid is read; repeat to catch a lost returncode
+            return [await executor.run_warm(pool, str(script), cwd=str(tmp_path)) for _ in range(20)]
+        finally:
+            await pool.stop()
+
+    for result in asyncio.run(scenario()):
+        assert not result.timed_out
+        assert (result.returncode, result.stdout, result.stderr) == (2, "hello\n", "oops\n")
+
+
+def test_stop_removes_the_socket_directory():
+    async def scenario():
+        pool = WarmPool(size=1)
+        await pool.start()
+        assert os.listdir(pool._dir)
+        await pool.stop()
+        return pool._dir
+
+    assert not os.path.exists(asyncio.run(scenario()))
+
+
+def test_zygote_exits_when_the_server_goes_away():
+    async def scenario():
+        pool = WarmPool(size=1)
+        await pool.start()
+        process, path = pool._zygotes[0]
+        process.stdin.close()
+        try:
+            return await asyncio.wait_for(process.wait(), 10), path
+        finally:
+            await pool.stop()
+
+    returncode, path = asyncio.run(scenario())
+    assert returncode == 0
+    assert not os.path.exists(path)
@@ -0,0 +1,354 @@
+"""
+Pre-forked ("zygote") interpreters for generated Python scripts.
+
+Each zygote is a long-lived `python3 warm_pool.py` process that imports the heavy
+modules generated scripts rely on (and loads the easyocr model) once. For every
+task the server hands it a script path plus the stdout/stderr pipe ends over a unix
+socket; the zygote forks, and the child runs the script with runpy in its own session.
+The zygote reports the child's pid immediately and its exit status when it finishes.
+A zygote's stdin is a pipe from the server; EOF on it means the server is gone, and the
+zygote kills its children and exits.
+"""
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import os
+import resource
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Tunables (overridable through the environment)
+WARM_POOL_SIZE = int(os.environ.get("WARM_POOL_SIZE", "2"))
+WARM_POOL_LANGUAGES = {
+    lang.strip() for lang in os.environ.get("WARM_POOL_LANGUAGES", "python").split(",") if lang.strip()
+}
+WARM_MODULES = [
+    mod.strip() for mod in os.environ.get(
+        "WARM_MODULES", "requests,markdown,lxml.html,duckdb,sqlite3,pydub,speech_recognition,bs4,git,easyocr"
+    ).split(",") if mod.strip()
+]
+WARM_EASYOCR_LANGS = [
+    lang.strip() for lang in os.environ.get("WARM_EASYOCR_LANGS", "en").split(",") if lang.strip()
+]
+WARM_START_TIMEOUT = float(os.environ.get("WARM_START_TIMEOUT", "120"))
+
+
+# ---------------------------------------------------------------------------
+# Zygote side (runs inside the warm interpreter)
+# ---------------------------------------------------------------------------
+
+def _preload():
+    """Imports the warm modules and primes the easyocr model cache."""
+    for name in WARM_MODULES:
+        try:
+            module = importlib.import_module(name)
+        except Exception as e:
+            print(f"warm_pool: could not preload {name}: {e}", file=sys.stderr)
+            continue
+        if name == "easyocr" and WARM_EASYOCR_LANGS:
+            try:
+                # Patch the constructor so scripts asking for the warm languages reuse the loaded reader.
+                warm_reader = module.Reader(WARM_EASYOCR_LANGS, gpu=False, verbose=False)
+                original = module.Reader
+
+                def reader(lang_list, *args, **kwargs):
+                    if list(lang_list) == WARM_EASYOCR_LANGS:
+                        return warm_reader
+                    return original(lang_list, *args, **kwargs)
+
+                module.Reader = reader
+            except Exception as e:
+                print(f"warm_pool: could not load easyocr model: {e}", file=sys.stderr)
+
+
+def _run_child(request: dict, fds: list, inherited: list):
+    """Body of the forked child: never returns."""
+    code = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for fd in inherited:
+            os.close(fd)
+        os.dup2(fds[0], 1)
+        os.dup2(fds[1], 2)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        for fd in fds + [devnull]:
+            os.close(fd)
+        sys.stdout = os.fdopen(1, "w", buffering=1, closefd=False)
+        sys.stderr = os.fdopen(2, "w", buffering=1, closefd=False)
+
+        memory_limit_mb = request.get("memory_limit_mb", 0)
+        if memory_limit_mb > 0:
+            # The zygote already holds the preloaded modules; budget on top of that baseline.
+            with open("/proc/self/status") as status:
+                vm_data = next(line for line in status if line.startswith("VmData:"))
+            baseline = int(vm_data.split()[1]) * 1024
+            limit = baseline + memory_limit_mb * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        script = request["script"]
+        sys.argv = [script]
+        sys.path.insert(0, os.path.dirname(script))
+        import runpy
+        code = 0
+        try:
+            runpy.run_path(script, run_name="__main__")
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+            if not isinstance(e.code, (int, type(None))):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            import traceback
+            traceback.print_exc()
+            code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _serve_connection(conn: socket.socket, children: dict, inherited: list):
+    message, fds, _, _ = socket.recv_fds(conn, 65536, 2)
+    if not message or len(fds) != 2:
+        for fd in fds:
+            os.close(fd)
+        conn.close()
+        return
+    request = json.loads(message)
+    pid = os.fork()
+    if pid == 0:
+        _run_child(request, fds, inherited + [conn.fileno()] + [c.fileno() for c in children.values()])
+    for fd in fds:
+        os.close(fd)
+    children[pid] = conn
+    conn.sendall(json.dumps({"pid": pid}).encode() + b"\n")
+
+
+def _reap(children: dict):
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        conn = children.pop(pid, None)
+        if conn is None:
+            continue
+        try:
+            conn.sendall(json.dumps({"returncode": os.waitstatus_to_exitcode(status)}).encode() + b"\n")
+        except OSError:
+            pass
+        conn.close()
+
+
+def _exit_orphaned(socket_path: str, children: dict):
+    """Called when the server has died: kills the running scripts and removes the socket."""
+    for pid in children:
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except OSError:
+            pass
+    try:
+        os.unlink(socket_path)
+    except OSError:
+        pass
+    os._exit(0)
+
+
+def zygote_main(socket_path: str):
+    """Preloads modules, then forks one child per request received on `socket_path` until stdin closes."""
+    import selectors
+    _preload()
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(64)
+    children = {}
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "accept")
+    selector.register(wakeup_r, selectors.EVENT_READ, "reap")
+    selector.register(sys.stdin.fileno(), selectors.EVENT_READ, "parent")
+    print("ready", flush=True)
+    while True:
+        for key, _ in selector.select():
+            if key.data == "accept":
+                conn, _ = server.accept()
+                try:
+                    _serve_connection(conn, children, [server.fileno(), wakeup_r, wakeup_w])
+                except Exception as e:
+                    print(f"warm_pool: bad request: {e}", file=sys.stderr)
+                    conn.close()
+            elif key.data == "parent":
+                if not os.read(sys.stdin.fileno(), 4096):
+                    _exit_orphaned(socket_path, children)
+            else:
+                os.read(wakeup_r, 4096)
+                _reap(children)
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+class WarmPoolUnavailable(RuntimeError):
+    """Raised when no zygote can take the script; callers fall back to a cold interpreter."""
+
+
+class WarmProcess:
+    """Process-like handle for a script running in a forked zygote child."""
+
+    def __init__(self, pid: int, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 stdout: asyncio.StreamReader, stderr: asyncio.StreamReader, transports: list):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._reader = reader
+        self._writer = writer
+        self._transports = transports
+
+    async def wait(self) -> int:
+        if self.returncode is None:
+            line = await self._reader.readline()
+            self.returncode = json.loads(line)["returncode"] if line else -signal.SIGKILL
+            self._writer.close()
+        return self.returncode
+
+    def close(self):
+        self._writer.close()
+        for transport in self._transports:
+            transport.close()
+
+
+async def _pipe_reader(fd: int):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    transport, _ = await loop.connect_read_pipe(
+        lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, "rb", buffering=0)
+    )
+    return reader, transport
+
+
+class WarmPool:
+    """Starts and supervises `size` zygotes and dispatches scripts to them round-robin."""
+
+    def __init__(self, size: int = WARM_POOL_SIZE, languages: set = None):
+        self.size = size
+        self.languages = WARM_POOL_LANGUAGES if languages is None else languages
+        self._dir = tempfile.mkdtemp(prefix="warm_pool_")
+        self._zygotes = []
+        self._cycle = None
+
+    def supports(self, language: str) -> bool:
+        return self._cycle is not None and language in self.languages
+
+    async def start(self):
+        if self.size <= 0 or not self.languages:
+            return
+        for index in range(self.size):
+            path = os.path.join(self._dir, f"zygote{index}.sock")
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, os.path.abspath(__file__), path,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+            try:
+                line = await asyncio.wait_for(process.stdout.readline(), WARM_START_TIMEOUT)
+            except asyncio.TimeoutError:
+                line = b""
+            except asyncio.CancelledError:
+                process.kill()
+                raise
+            if line.strip() != b"ready":
+                logger.error(f"Warm zygote {index} failed to start; scripts will use a cold interpreter")
+                process.kill()
+                continue
+            self._zygotes.append((process, path))
+        self._cycle = itertools.cycle(self._zygotes) if self._zygotes else None
+        logger.info(f"Warm pool started with {len(self._zygotes)} zygote(s)")
+
+    async def stop(self):
+        for process, _ in self._zygotes:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+        self._zygotes = []
+        self._cycle = None
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    async def spawn(self, script_path: str, *, cwd: str = None, memory_limit_mb: int = 0) -> WarmProcess:
+        """Forks a warm child running `script_path`; returns once its pid is known."""
+        process, path = next(self._cycle)
+        if process.returncode is not None:
+            raise WarmPoolUnavailable("Warm zygote has exited")
+        request = {"script": script_path, "cwd": cwd, "memory_limit_mb": memory_limit_mb}
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        try:
+            sock = await asyncio.to_thread(_handshake, path, request, [out_w, err_w])
+        except OSError as e:
+            os.close(out_r)
+            os.close(err_r)
+            raise WarmPoolUnavailable(str(e)) from e
+        except BaseException:
+            os.close(out_r)
+            os.close(err_r)
+            raise
+        finally:
+            os.close(out_w)
+            os.close(err_w)
+        try:
+            # The pid and returncode lines can arrive together for a fast script, so both are
+            # read through the same buffered stream
+            reader, writer = await asyncio.open_unix_connection(sock=sock)
+            try:
+                line = await reader.readline()
+                if not line:
+                    raise WarmPoolUnavailable("Warm zygote closed the connection")
+                pid = json.loads(line)["pid"]
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            os.close(out_r)
+            os.close(err_r)
+            raise
+        stdout, out_transport = await _pipe_reader(out_r)
+        stderr, err_transport = await _pipe_reader(err_r)
+        return WarmProcess(pid, reader, writer, stdout, stderr, [out_transport, err_transport])
+
+
+def _handshake(path: str, request: dict, fds: list) -> socket.socket:
+    """Sends a request plus the pipe ends to a zygote; the reply is read on the event loop."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        socket.send_fds(sock, [json.dumps(request).encode()], fds)
+        sock.setblocking(False)
+        return sock
+    except BaseException:
+        sock.close()
+        raise
+
+
+if __name__ == "__main__":
+    zygote_main(sys.argv[1])